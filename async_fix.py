@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""fix code without blocking an asyncio event loop
+
+the tests run in an executor (threads by default, or processes)
+each one in a child process with a timeout (run_code.LimitedCheck),
+a test that loops forever would take an executor thread forever otherwise
+the rest of the fix loop is cheap and runs in the event loop itself
+a newer version of a file cancels the fix of the older one"""
+
+import asyncio
+import run_code
+import fix_code
+
+
+async def check_async(name, source_code, test_code, test_id=None,
+                      executor=None, check=None):
+    """like run_code.check, in the executor
+    check runs the test, by default run_code.LimitedCheck()"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor,
+                                      check or run_code.LimitedCheck(), name,
+                                      source_code, test_code, test_id)
+
+
+class AsyncTargetedCheck:
+    """like run_code.TargetedCheck, see there"""
+    def __init__(self, executor=None, check=None):
+        self.executor = executor
+        self.check = check or run_code.LimitedCheck()
+        self.test_id = None
+
+    async def __call__(self, name, source_code, test_code):
+        if self.test_id is not None:
+            res = await check_async(name, source_code, test_code,
+                                    self.test_id, self.executor, self.check)
+            if res:
+                return res
+        res = await check_async(name, source_code, test_code,
+                                executor=self.executor, check=self.check)
+        self.test_id = res.test_id if res else None
+        return res
+
+
+async def run_steps(steps, check):
+    """like fix_code.run_steps, but awaits the checks"""
+    try:
+        code = next(steps)
+        while True:
+            if isinstance(code, list):
+                # candidate fixes, all checked at the same time
+                res = list(await asyncio.gather(
+                    *[check(el.name, el.source, el.test) for el in code]))
+            else:
+                res = await check(code.name, code.source, code.test)
+            code = steps.send(res)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def fixed_code_and_issue_async(broken_code, executor=None, width=1,
+                                     check=None):
+    return await run_steps(fix_code.fixing_steps(broken_code, width),
+                           AsyncTargetedCheck(executor, check))
+
+
+async def fixed_code_async(broken_code, executor=None, width=1, check=None):
+    """like fix_code.fixed_code
+    with a width > 1, candidate fixes are checked concurrently
+    cancelling it stops the fix loop before the next check
+    a check that is already running finishes in the background
+    (or times out, see check_async)"""
+    res = await fixed_code_and_issue_async(broken_code, executor, width,
+                                           check)
+    return res[0]
+
+
+class Fixer:
+    """fixes several files at once, only the latest version of each"""
+    def __init__(self, executor=None, check=None):
+        self.executor = executor
+        self.check = check
+        self.tasks = {}  # key (e.g. the file name) -> task
+
+    def fix(self, key, code):
+        """a task that results in the fixed code
+        cancels the fix of the previous version with the same key"""
+        old = self.tasks.get(key)
+        if old is not None:
+            old.cancel()
+        task = asyncio.ensure_future(
+            fixed_code_async(code, self.executor, check=self.check))
+        self.tasks[key] = task
+        task.add_done_callback(lambda task: self.forget(key, task))
+        return task
+
+    def forget(self, key, task):
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+
+    async def wait(self):
+        """until all fixes are done"""
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""fix every test/source pair of a project at once
+
+the pairs are found the same way create_file pairs a new test with its
+source file and are fixed in parallel, one process per core
+pairs that share a module are fixed one after the other in the same
+process, otherwise one of them would overwrite the other's fixes
+only files that changed are written, atomically
+a test without a source file is skipped, it's probably not the project's
+(create_file.py is there to start a new pair)"""
+
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from py import path
+import create_file
+import multi_sut
+import save_file
+
+statuses = ['fixed', 'unchanged', 'broken', 'skipped']
+
+
+def pairs(root):
+    """test and source file of every test below root"""
+    for name in create_file.test_files(root):
+        yield create_file.FilePair(path.local(name))
+
+
+def fix_pair(test_name):
+    """fixes a single pair, returns the status and the time it took
+    runs in a worker process, so it only gets and returns plain data"""
+    start = time.perf_counter()
+    pair = create_file.FilePair(path.local(test_name))
+    if not pair.source_file.check():
+        return test_name, 'skipped', time.perf_counter() - start
+    try:
+        files, issue = save_file.fixed_files(
+            pair.test_file, pair.source_file, save_file.cached_check())
+        changed = [save_file.write_if_changed(el, new)
+                   for el, _, new in files]
+        if issue is not None:
+            status = 'broken'
+        else:
+            status = 'fixed' if any(changed) else 'unchanged'
+    except Exception:
+        # a test that crashes the fix loop is as broken as it gets
+        status = 'broken'
+    return test_name, status, time.perf_counter() - start
+
+
+def written_files(pair):
+    """the files fixing the pair might write, see save_file.fixed_files"""
+    directory = pair.source_file.dirpath()
+    try:
+        test = pair.test_file.read()
+    except OSError:
+        test = ''
+    return {str(pair.test_file), str(pair.source_file)} | \
+        {str(directory.join(el + '.py'))
+         for el in multi_sut.local_imports(test, str(directory))}
+
+
+def groups(pairs):
+    """lists of test files, pairs that share a file are in the same list"""
+    res = []  # (test files, files they might write)
+    for pair in pairs:
+        names, files = [str(pair.test_file)], written_files(pair)
+        for other in [el for el in res if el[1] & files]:
+            res.remove(other)
+            names = other[0] + names
+            files |= other[1]
+        res.append((names, files))
+    return [names for names, _ in res]
+
+
+def fix_group(test_names):
+    return [fix_pair(el) for el in test_names]
+
+
+def fix_all(root, jobs=None):
+    """{test file: (status, seconds)} for all tests below root"""
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return {name: (status, duration)
+                for results in executor.map(fix_group, groups(pairs(root)),
+                                            chunksize=8)
+                for name, status, duration in results}
+
+
+def summary(results, elapsed):
+    counts = {status: 0 for status in statuses}
+    for status, _ in results.values():
+        counts[status] += 1
+    lines = [f'{status:<10}{counts[status]:>8}' for status in statuses]
+    lines.append(f'{"total":<10}{len(results):>8}')
+    lines.append(f'{"elapsed":<10}{elapsed:>7.1f}s')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', nargs='?', default='.')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes (default: one per core)')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    results = fix_all(os.path.abspath(args.root), args.jobs)
+    for name, (status, _) in sorted(results.items()):
+        if status == 'broken':
+            print(f'broken: {name}')
+    print(summary(results, time.perf_counter() - start))
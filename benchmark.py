@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""how fast does the red to green loop go?
+
+generates broken test/SUT pairs of growing size, fixes them and reports
+wall time, number of checks, iterations per fix and peak memory
+the results are saved as JSON, to compare them across commits"""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import subprocess
+from code import Code
+import run_code
+import fix_code
+
+
+class Case:
+    """a broken pair with the given number of defects
+    functions: missing functions, called with two arguments each
+    classes: missing classes, with attributes missing attributes in total
+    arguments: existing functions called with one argument too many
+    padding: functions the SUT already has, to make it longer
+    tests: number of test methods the defects are spread over"""
+    def __init__(self, name, functions=0, classes=0, attributes=0,
+                 arguments=0, padding=0, tests=1):
+        self.name = name
+        self.functions = functions
+        self.classes = max(classes, 1 if attributes else 0)
+        self.attributes = attributes
+        self.arguments = arguments
+        self.padding = padding
+        self.tests = tests
+
+    def defects(self):
+        return self.functions + self.classes + self.attributes \
+            + self.arguments
+
+    def parameters(self):
+        return {'functions': self.functions, 'classes': self.classes,
+                'attributes': self.attributes, 'arguments': self.arguments,
+                'padding': self.padding, 'tests': self.tests}
+
+    def snippets(self):
+        """a few test lines per defect"""
+        res = [[f'bla = blubb.function_{i}(1, 2)']
+               for i in range(self.functions)]
+        for i in range(self.classes):
+            lines = [f'obj = blubb.Class_{i}()']
+            lines += [f'bla = obj.attribute_{j}'
+                      for j in range(i, self.attributes, self.classes)]
+            res.append(lines)
+        res += [[f'bla = blubb.existing_{i}(1)']
+                for i in range(self.arguments)]
+        return res
+
+    def test(self):
+        methods = [[] for _ in range(self.tests)]
+        for i, snippet in enumerate(self.snippets()):
+            methods[i % self.tests] += snippet
+        res = 'import blubb\nimport unittest\n\n\n'
+        res += 'class TestSomething(unittest.TestCase):\n'
+        for i, lines in enumerate(methods):
+            res += f'    def test_{i}(self):\n'
+            for line in lines or ['pass']:
+                res += f'        {line}\n'
+            res += '\n'
+        return res
+
+    def source(self):
+        res = ''
+        for i in range(self.arguments):
+            res += f'def existing_{i}():\n    pass\n\n\n'
+        for i in range(self.padding):
+            res += f'def padding_{i}(x):\n    return x + {i}\n\n\n'
+        return res
+
+    def code(self):
+        return Code('blubb', self.test(), self.source())
+
+
+def cases(sizes=(1, 4, 16)):
+    for n in sizes:
+        yield Case(f'functions-{n}', functions=n)
+        yield Case(f'classes-{n}', classes=n)
+        yield Case(f'attributes-{n}', attributes=n)
+        yield Case(f'arguments-{n}', arguments=n)
+        yield Case(f'padding-{n * 50}', functions=1, padding=n * 50)
+        yield Case(f'tests-{n}', functions=n, tests=n)
+
+
+class CountingCheck:
+    def __init__(self, check=run_code.check):
+        self.check = check
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.check(*args, **kwargs)
+
+
+def fix(case):
+    """fixes the case once, returns the counters and whether it worked"""
+    checks = CountingCheck()
+    iterations = CountingCheck(run_code.TargetedCheck(checks))
+    res = fix_code.fixed_code(case.code(), iterations)
+    return {'checks': checks.calls, 'iterations': iterations.calls,
+            'fixed': fix_code.problem(res) is None}
+
+
+def run(case, repeat=3):
+    """best wall time of repeat runs
+    memory is measured in a separate run, tracemalloc slows things down"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = fix(case)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fix(case)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    res.update(name=case.name, parameters=case.parameters(),
+               seconds=min(times), peak_bytes=peak,
+               iterations_per_fix=res['iterations'] / max(case.defects(), 1))
+    return res
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results):
+    lines = [f'{"case":<16}{"ms":>9}{"checks":>8}{"it/fix":>8}'
+             f'{"peak KiB":>10}  fixed']
+    for el in results:
+        lines.append(f'{el["name"]:<16}{el["seconds"] * 1000:>9.1f}'
+                     f'{el["checks"]:>8}{el["iterations_per_fix"]:>8.2f}'
+                     f'{el["peak_bytes"] / 1024:>10.0f}  {el["fixed"]}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', default='benchmark.json',
+                        help='where to save the results')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+    results = []
+    for case in cases(args.sizes):
+        results.append(run(case, args.repeat))
+        print(report(results[-1:]).splitlines()[-1], file=sys.stderr)
+    with open(args.output, 'w') as file:
+        json.dump({'commit': commit(), 'python': platform.python_version(),
+                   'cases': results}, file, indent=2)
+    print(report(results))
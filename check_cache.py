@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""remember the results of checks
+
+results are keyed on a hash of the SUT's name, source and test
+(and the id of the test, if the check is restricted to one)
+the modules the check imported from the project are remembered, too,
+a result is only used as long as they haven't changed
+this assumes that the result only depends on the code
+so don't use it if the tests read files or talk to the network"""
+
+import os
+import sys
+import pickle
+import hashlib
+import importlib.machinery
+from collections import OrderedDict
+import run_code
+from module_snapshot import installed
+
+
+def normalized(text):
+    """only line endings: even trailing whitespace can be in a string"""
+    return text.replace('\r\n', '\n')
+
+
+def cache_key(name, source_code, test_code, test_id=None):
+    if isinstance(name, tuple):
+        # several SUTs, see multi_sut
+        name = '\0'.join(name)
+        source_code = '\0'.join(normalized(el) for el in source_code)
+    res = hashlib.sha256()
+    for el in (name, normalized(source_code), normalized(test_code),
+               test_id or ''):
+        res.update(el.encode())
+        res.update(b'\0')
+    return res.hexdigest()
+
+
+def located(name, path):
+    """(file, mtime) of the module, (None, None) if there isn't one"""
+    try:
+        spec = importlib.machinery.PathFinder.find_spec(name, path)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None or not spec.has_location:
+        return None, None
+    try:
+        return spec.origin, os.stat(spec.origin).st_mtime_ns
+    except OSError:
+        return spec.origin, None
+
+
+def dependencies(imports):
+    """(name, path, file, mtime) of the imports that might change
+    installed libraries don't, but missing modules might appear"""
+    res = []
+    for name, path in dict.fromkeys(imports):
+        if name in sys.builtin_module_names:
+            continue
+        file, mtime = located(name, path)
+        if file is None or not os.path.realpath(file).startswith(installed):
+            res.append((name, path, file, mtime))
+    return res
+
+
+def unchanged(dependencies):
+    return all(located(name, path) == (file, mtime)
+               for name, path, file, mtime in dependencies)
+
+
+missing = object()
+
+
+def file_size(name):
+    """0 if it's gone, e.g. evicted by another process"""
+    try:
+        return os.path.getsize(name)
+    except FileNotFoundError:
+        return 0
+
+
+class DiskCache:
+    """pickled results in a directory, oldest ones go first
+    format can be any module with load and dump, like marshal"""
+    def __init__(self, directory, max_bytes, format=pickle, suffix='.pickle'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.format = format
+        self.suffix = suffix
+        os.makedirs(directory, exist_ok=True)
+        self.bytes = sum(file_size(el) for el in self.files())
+
+    def files(self):
+        return [os.path.join(self.directory, el)
+                for el in os.listdir(self.directory)
+                if el.endswith(self.suffix)]
+
+    def file(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        try:
+            with open(self.file(key), 'rb') as file:
+                return self.format.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError,
+                TypeError):
+            return missing
+
+    def put(self, key, result):
+        tmp = self.file(key) + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as file:
+            self.format.dump(result, file)
+        # the key might be there already
+        self.bytes += file_size(tmp) - file_size(self.file(key))
+        # rename is atomic, so other processes never see half a file
+        os.replace(tmp, self.file(key))
+        if self.bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """other processes (e.g. batch.py's) might share the directory
+        and evict files at the same time"""
+        files = []
+        for el in self.files():
+            try:
+                info = os.stat(el)
+            except FileNotFoundError:
+                continue
+            files.append((info.st_mtime, info.st_size, el))
+        files.sort()
+        # the other processes' files count, too
+        self.bytes = sum(size for _, size, _ in files)
+        while files and self.bytes > self.max_bytes / 2:
+            _, size, file = files.pop(0)
+            self.bytes -= size
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+
+
+class CachedCheck:
+    """behaves like check but remembers the latest results
+    optionally keeps them on disk, too, so they survive the process"""
+    def __init__(self, check=run_code.check, size=1024, directory=None,
+                 max_disk_bytes=64 * 1024 * 1024):
+        self.check = check
+        self.size = size
+        self.entries = OrderedDict()
+        self.disk = DiskCache(directory, max_disk_bytes) \
+            if directory else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __call__(self, name, source_code, test_code, test_id=None):
+        key = cache_key(name, source_code, test_code, test_id)
+        entry = self.entries.get(key)
+        if entry is not None and unchanged(entry[1]):
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+        entry = self.disk.get(key) if self.disk else missing
+        # older caches only stored the result
+        if type(entry) is tuple and unchanged(entry[1]):
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            with run_code.ImportRecorder() as recorder:
+                res = self.check(name, source_code, test_code, test_id)
+            entry = res, dependencies(recorder.imports)
+            if self.disk:
+                self.disk.put(key, entry)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return entry[0]
+
+    def report(self):
+        return f'{self.hits} hits, {self.disk_hits} disk hits, ' \
+            f'{self.misses} misses'
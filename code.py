@@ -1,14 +1,59 @@
 #!/usr/bin/env python3
+from symbols import symbol_table
 
 
 class Code:
-    def __init__(self, name, test, source):
+    """the test and the source of the SUT
+
+    the source is kept as a list of lines as well
+    fixes edit single lines instead of splitting and joining the source
+    the string is only put back together when someone asks for it
+    the symbol table of the source is updated by each edit"""
+    def __init__(self, name, test, source=None, lines=None, symbols=None):
         self.name = name
         self.test = test
-        self.source = source
+        self._source = source
+        self._lines = lines
+        self._symbols = symbols
+
+    @property
+    def source(self):
+        if self._source is None:
+            self._source = '\n'.join(self._lines)
+        return self._source
+
+    @property
+    def source_lines(self):
+        """don't modify the result, use with_changed_lines instead"""
+        if self._lines is None:
+            self._lines = self._source.split('\n')
+        return self._lines
+
+    @property
+    def symbols(self):
+        """symbols.SymbolTable, None if the source doesn't parse"""
+        if self._symbols is None:
+            self._symbols = symbol_table(self.source_lines)
+        return self._symbols
 
     def with_changed_source(self, source):
         return Code(self.name, self.test, source)
 
     def with_changed_test(self, test):
-        return Code(self.name, test, self.source)
+        return Code(self.name, test, self._source, self._lines,
+                    self._symbols)
+
+    def with_changed_lines(self, start, end, new_lines):
+        """replace the source lines[start:end] with new_lines"""
+        lines = self.source_lines[:]
+        lines[start:end] = new_lines
+        # if there's no table yet, it gets built when it's needed
+        symbols = self._symbols.changed(start, end, new_lines) \
+            if self._symbols is not None else None
+        return Code(self.name, self.test, lines=lines, symbols=symbols)
+
+    def with_inserted_lines(self, pos, new_lines):
+        return self.with_changed_lines(pos, pos, new_lines)
+
+    def with_deleted_lines(self, start, end):
+        return self.with_changed_lines(start, end, [])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""compile each version of the SUT and the test only once
+
+code objects are keyed on a hash of the text and the file name
+with a directory, they're also marshalled to disk, like __pycache__"""
+
+import sys
+import marshal
+import hashlib
+import threading
+from types import CodeType
+from collections import OrderedDict
+
+
+def cache_key(text, filename):
+    res = hashlib.sha256()
+    # marshalled code only works with the Python version that wrote it
+    for el in (sys.implementation.cache_tag, filename, text):
+        res.update(el.encode(errors='surrogatepass'))
+        res.update(b'\0')
+    return res.hexdigest()
+
+
+class CodeCache:
+    def __init__(self, size=256):
+        self.size = size
+        self.entries = OrderedDict()
+        # checks may run in several threads (see async_fix)
+        self.lock = threading.Lock()
+        self.disk = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def persist(self, directory, max_bytes=64 * 1024 * 1024):
+        # imported here: check_cache imports run_code, which imports us
+        from check_cache import DiskCache
+        self.disk = DiskCache(directory, max_bytes, marshal, '.marshal')
+
+    def compile(self, text, filename):
+        """like compile(text, filename, 'exec')"""
+        key = cache_key(text, filename)
+        with self.lock:
+            res = self.entries.get(key)
+            if res is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return res
+        res = self.disk.get(key) if self.disk else None
+        if not isinstance(res, CodeType):
+            self.misses += 1
+            res = compile(text, filename, 'exec')
+            if self.disk:
+                self.disk.put(key, res)
+        else:
+            self.disk_hits += 1
+        with self.lock:
+            self.entries[key] = res
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return res
+
+    def report(self):
+        return f'{self.hits} hits, {self.disk_hits} disk hits, ' \
+            f'{self.misses} misses'
+
+
+cache = CodeCache()
+
+
+def compiled(text, filename):
+    return cache.compile(text, filename)
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 
 
+import os
 import sys
 from py import path
 import template
+from module_snapshot import installed
 
 
 def add_if_missing(file, content=''):
@@ -12,6 +14,31 @@ def add_if_missing(file, content=''):
         file.write(content, ensure=True)
 
 
+def is_test_file(name):
+    basename = os.path.basename(name)
+    return basename.startswith('test_') and basename.endswith('.py')
+
+
+def is_installed(directory):
+    """the tests of libraries and virtualenvs aren't the project's"""
+    return os.path.basename(directory) in ('site-packages', 'dist-packages') \
+        or os.path.exists(os.path.join(directory, 'pyvenv.cfg')) \
+        or os.path.join(os.path.realpath(directory), '').startswith(installed)
+
+
+def test_files(directory):
+    """all test files below directory
+    skipping hidden directories and installed libraries"""
+    for dir, subdirectories, files in os.walk(directory):
+        subdirectories[:] = sorted(
+            el for el in subdirectories
+            if not el.startswith('.')
+            and not is_installed(os.path.join(dir, el)))
+        for file in sorted(files):
+            if is_test_file(file):
+                yield os.path.join(dir, file)
+
+
 def join_directories(base, directories):
     """join base directory of type py.path
     with a list of sub directories (strings)"""
@@ -57,8 +84,9 @@ class FilePair(object):
         if self.source_file is not None:
             add_if_missing(self.source_file)
         if self.test_file is not None:
+            style = os.environ.get('GREENER_PYTHON_TEMPLATE', 'unittest')
             add_if_missing(self.test_file,
-                           template.create(self.test_file.basename))
+                           template.create(self.test_file.basename, style))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""thin client for fix_server.py
+
+only uses the standard library so that asking the server is cheap
+compared to importing the whole fix loop"""
+
+import os
+import json
+import stat
+import socket
+import tempfile
+
+
+class ServerError(Exception):
+    pass
+
+
+def private_directory():
+    """$XDG_RUNTIME_DIR, or a directory in the temp directory
+    that only the current user can use
+    otherwise anyone could start a server on our socket first
+    and answer our requests with whatever they like"""
+    res = os.environ.get('XDG_RUNTIME_DIR')
+    if not res:
+        res = os.path.join(tempfile.gettempdir(),
+                           f'greener-python-{os.getuid()}')
+        try:
+            os.mkdir(res, 0o700)
+        except FileExistsError:
+            pass
+    info = os.lstat(res)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() \
+            or info.st_mode & 0o077:
+        raise ServerError(f'{res} is not a private directory')
+    return res
+
+
+def socket_path():
+    res = os.environ.get('GREENER_PYTHON_SOCKET')
+    if res:
+        return res
+    return os.path.join(private_directory(), 'greener-python.sock')
+
+
+def owned(address):
+    """the socket was bound by the current user"""
+    try:
+        return os.lstat(address).st_uid == os.getuid()
+    except FileNotFoundError:
+        return True  # connecting fails anyway
+
+
+def default_timeout():
+    """seconds to wait for the server, GREENER_PYTHON_SERVER_TIMEOUT"""
+    return float(os.environ.get('GREENER_PYTHON_SERVER_TIMEOUT', 30))
+
+
+def call(method, address=None, timeout=None, **params):
+    """send a single JSON-RPC request to the server
+    returns the response or None if no server is running
+    or if it doesn't answer within timeout seconds
+    (the server still finishes the request then, see save_file.save_pair)"""
+    address = address or socket_path()
+    if not owned(address):
+        raise ServerError(f'{address} belongs to someone else')
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout or default_timeout())
+    try:
+        connection.connect(address)
+    except (FileNotFoundError, ConnectionRefusedError, TimeoutError):
+        connection.close()
+        return None
+    request = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}
+    with connection, connection.makefile('rwb') as stream:
+        try:
+            stream.write(json.dumps(request).encode() + b'\n')
+            stream.flush()
+            line = stream.readline()
+        except TimeoutError:
+            return None
+    if not line:
+        return None  # the server went away
+    try:
+        response = json.loads(line)
+    except ValueError:
+        raise ServerError(f'malformed response: {line[:80]!r}')
+    if not isinstance(response, dict):
+        raise ServerError(f'malformed response: {line[:80]!r}')
+    if 'error' in response:
+        raise ServerError(response['error']['message'])
+    return response
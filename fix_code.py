@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 
 import run_code
+import matchers
 import missing_import
 import invalid_import
 import missing_variable
-import missing_attribute
-import missing_function
-import missing_argument
+# imported for their matchers, which register themselves
+import missing_attribute  # noqa: F401
+import missing_function  # noqa: F401
+import missing_argument  # noqa: F401
+import resource_limit
+import static_analysis
+import tracing
 
 
 class JustBroken:
@@ -14,24 +19,98 @@ class JustBroken:
         pass
 
 
-def problem(code):
-    error = run_code.check(code.name, code.source, code.test)
-    if not error:
+# the fix loop stops at these, there's nothing to fix
+# a test that runs into a limit would only run into it again
+unfixable = (JustBroken, resource_limit.ResourceLimit)
+
+
+def problem(code, check=run_code.check):
+    return run_steps(problem_steps(code), check)
+
+
+def run_steps(steps, check, check_many=None):
+    """drives a generator like problem_steps with a blocking check
+    check_many checks a list of codes, one after the other by default
+    async_fix drives the same generators without blocking"""
+    try:
+        code = next(steps)
+        while True:
+            if isinstance(code, list):
+                res = check_many(code) if check_many else \
+                    [check(el.name, el.source, el.test) for el in code]
+            else:
+                res = check(code.name, code.source, code.test)
+            code = steps.send(res)
+    except StopIteration as stop:
+        return stop.value
+
+
+def problem_steps(code):
+    """problem as a generator: yields the code that needs checking
+    and expects the result of the check in return"""
+    with tracing.span('check'):
+        failure = yield code
+    if not failure:
         return None
-    # the first function that matches the error message
-    # determines the result
-    match_functions = [missing_attribute.match_missing_attribute,
-                       missing_variable.match_missing_variable,
-                       missing_import.match_missing_import,
-                       invalid_import.match_invalid_import,
-                       missing_function.MissingFunctionMatcher(code.test),
-                       missing_argument.MissingArgumentMatcher(code.test)]
-    for line in error.split('\n'):
-        for fun in match_functions:
-            match = fun(line)
-            if match:
-                return match
-    return JustBroken()
+    with tracing.span('match') as span:
+        res = matching_issue(failure, code)
+        span.set(issue=type(res).__name__)
+    return res
+
+
+def candidates_steps(codes):
+    """like problem_steps for several versions of the code at once
+    yields the list of codes and expects a list of results in return"""
+    with tracing.span('check', candidates=len(codes)):
+        failures = yield codes
+    with tracing.span('match'):
+        return [matching_issue(failure, code) if failure else None
+                for failure, code in zip(failures, codes)]
+
+
+def changed(code, new_code):
+    return new_code.source != code.source or new_code.test != code.test
+
+
+def candidate_fixes(issue, code, width=1):
+    """(issue, fixed code) for the issue and up to width - 1 alternatives
+    matchers guess: is it a class or a function, does it need self?
+    alternatives that come to the same result are left out"""
+    res = [(issue, issue.fix(code))]
+    alternatives = getattr(issue, 'alternatives', list)()
+    for el in alternatives:
+        if len(res) >= width:
+            break
+        new_code = el.fix(code)
+        if changed(code, new_code) and \
+                all(changed(new_code, other) for _, other in res):
+            res.append((el, new_code))
+    return res
+
+
+def stuck(issue, code):
+    """there's an issue but fixing it doesn't change anything"""
+    return bool(issue) and type(issue) not in unfixable \
+        and not changed(code, issue.fix(code))
+
+
+def progress(old_issue, new_issue, new_code):
+    """how good a candidate fix is, lower is better"""
+    if not new_issue:
+        return 0
+    if type(new_issue) is resource_limit.ResourceLimit:
+        return 4
+    if not improved(old_issue, new_issue):
+        return 3
+    if type(new_issue) in unfixable or stuck(new_issue, new_code):
+        # nothing to do after this one
+        return 2
+    return 1
+
+
+def matching_issue(failure, code):
+    # the first matcher that recognizes the failure determines the result
+    return matchers.registry.match(failure, code) or JustBroken()
 
 
 def improved(old_issue, new_issue):
@@ -45,15 +124,138 @@ def improved(old_issue, new_issue):
     return old_issue.name != new_issue.name
 
 
-def fixed_code(broken_code):
-    code = broken_code
-    issues = problem(code)
-    while issues and (type(issues) != JustBroken):
+# these fixes only prepend a line to the test or the SUT
+# so they can't get into each other's way
+independent_issues = (missing_variable.MissingVariable,
+                      missing_import.MissingImport)
+
+
+def same_issue(issue, other):
+    return type(issue) is type(other) and issue.name == other.name
+
+
+def problems(code, check_all=run_code.check_all):
+    """the issues of all failing tests, found in a single run
+    the first one is the one problem would return"""
+    failures = check_all(code.name, code.source, code.test)
+    if type(failures) is run_code.Failure:
+        # e.g. run_code.LimitedCheck, if the run timed out
+        failures = [failures]
+    res = []
+    for failure in failures:
+        issue = matching_issue(failure, code)
+        if not any(same_issue(issue, el) for el in res
+                   if type(el) is not JustBroken):
+            res.append(issue)
+    return res
+
+
+def independent(issues):
+    return [el for el in issues if type(el) in independent_issues]
+
+
+def batch_improved(batch, new_issues):
+    return all(improved(old, new) for old in batch for new in new_issues)
+
+
+def first(issues):
+    return issues[0] if issues else None
+
+
+def fixed_code(broken_code, check=None):
+    """check can be anything that behaves like run_code.check
+    e.g. the check method of a worker_pool.WorkerPool
+    by default, only the failing test is re-run while fixing"""
+    return fixed_code_and_issue(broken_code, check)[0]
+
+
+def fixed_code_and_issue(broken_code, check=None):
+    """like fixed_code but also returns the issue that's left
+    None if all tests pass"""
+    with tracing.span('fixed_code', sut=broken_code.name):
+        return run_steps(fixing_steps(broken_code),
+                         check or run_code.TargetedCheck())
+
+
+def fixing_steps(broken_code, width=1):
+    """the fix loop as a generator, see problem_steps
+    with a width > 1, several candidate fixes are checked at once
+    (see speculative) and the one that makes the most progress wins"""
+    with tracing.span('static_analysis'):
+        code = static_analysis.stubbed(broken_code)
+    issues = yield from problem_steps(code)
+    if code is not broken_code and not issues and \
+            not static_analysis.defines_nothing(broken_code):
+        # the SUT might define the names in a way we can't see
+        # (then the stubs are junk that's overridden later on)
+        unstubbed = yield from problem_steps(broken_code)
+        if not unstubbed:
+            return broken_code, None
+    if code is not broken_code and (type(issues) is JustBroken or width > 1
+                                    and stuck(issues, code)):
+        # the static stubs broke something, so don't trust them
+        # when speculating: the stubs are guesses, too
+        code = broken_code
+        issues = yield from problem_steps(code)
+    while issues and (type(issues) not in unfixable):
         issue = issues
-        new_code = issue.fix(code)
-        new_issue = problem(new_code)
-        if not improved(issues, new_issue):
+        with tracing.span('iteration', issue=type(issue).__name__) as span:
+            with tracing.span('fix'):
+                candidates = candidate_fixes(issue, code, width)
+            if len(candidates) == 1:
+                new_code = candidates[0][1]
+                new_issue = yield from problem_steps(new_code)
+            else:
+                new_issues = yield from candidates_steps(
+                    [el for _, el in candidates])
+                best = min(range(len(candidates)), key=lambda i: progress(
+                    issue, new_issues[i], candidates[i][1]))
+                new_code = candidates[best][1]
+                new_issue = new_issues[best]
+                span.set(candidates=len(candidates),
+                         chosen=type(candidates[best][0]).__name__)
+            accepted = improved(issues, new_issue)
+            span.set(improved=accepted)
+        if not accepted:
             break
         code = new_code
         issues = new_issue
-    return code
+    return code, issues
+
+
+def batch_fixed_code(broken_code, check_all=run_code.check_all):
+    """like fixed_code but fixes all independent issues at once
+    falls back to fixing one issue at a time if that doesn't help
+    saves a lot of runs if many tests are broken in similar ways"""
+    return batch_fixed_code_and_issue(broken_code, check_all)[0]
+
+
+def batch_fixed_code_and_issue(broken_code, check_all=run_code.check_all):
+    """like batch_fixed_code but also returns the issue that's left"""
+    code = static_analysis.stubbed(broken_code)
+    issues = problems(code, check_all)
+    if code is not broken_code and not issues \
+            and not static_analysis.defines_nothing(broken_code) \
+            and not problems(broken_code, check_all):
+        return broken_code, None
+    if code is not broken_code and type(first(issues)) is JustBroken:
+        code = broken_code
+        issues = problems(code, check_all)
+    while issues and (type(issues[0]) not in unfixable):
+        batch = independent(issues)
+        if len(batch) > 1:
+            new_code = code
+            for issue in batch:
+                new_code = issue.fix(new_code)
+            new_issues = problems(new_code, check_all)
+            if batch_improved(batch, new_issues):
+                code = new_code
+                issues = new_issues
+                continue
+        new_code = issues[0].fix(code)
+        new_issues = problems(new_code, check_all)
+        if not improved(issues[0], first(new_issues)):
+            break
+        code = new_code
+        issues = new_issues
+    return code, first(issues)
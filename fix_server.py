@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""keep the fix loop warm in a long running process
+
+save_file.py talks to this server (via fix_client) if it is running
+requests are newline delimited JSON-RPC over a unix socket"""
+
+import os
+import sys
+import json
+import time
+import socketserver
+import fix_client
+import tracing
+import save_file
+from code import Code
+from run_code import TargetedCheck
+from run_code import AlarmCheck
+from run_code import LimitedCheck
+from check_cache import CachedCheck
+from incremental import IncrementalCheck
+from module_snapshot import IsolatedCheck
+
+
+def server_check():
+    """the SUT is only executed again where it changed
+    the timeout is an alarm in this process, so that's kept
+    a memory limit needs a child process that forgets what it executed,
+    so that one is opt-in here"""
+    check = IncrementalCheck(IsolatedCheck(keep=save_file.kept_packages()))
+    kwargs = save_file.limits()
+    if kwargs is None:
+        return check
+    if kwargs['max_memory'] is not None:
+        return LimitedCheck(check, **kwargs)
+    return AlarmCheck(check, kwargs['timeout'])
+
+
+# saving an unchanged file again doesn't run any tests
+cache = CachedCheck(server_check())
+
+
+def fix(name, test, source):
+    res, _ = save_file.fixed_code_and_issue(Code(name, test, source),
+                                            TargetedCheck(cache))
+    return {'test': res.test, 'source': res.source}
+
+
+def save(test_file):
+    save_file.save(test_file, TargetedCheck(cache))
+    return {}
+
+
+def patch(test_file, directory=None):
+    lines = save_file.patch(test_file, TargetedCheck(cache), directory)
+    return {'patch': ''.join(lines)}
+
+
+def stats():
+    return {'cache': cache.report()}
+
+
+methods = {'fix': fix, 'save': save, 'patch': patch, 'stats': stats}
+
+
+def parsed(line):
+    """(request, None), or ({}, error) if the line isn't a request"""
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {}, {'code': -32700, 'message': str(e)}
+    if not isinstance(request, dict):
+        return {}, {'code': -32600, 'message': 'invalid request'}
+    return request, None
+
+
+def respond(request):
+    start = time.perf_counter()
+    method = methods.get(request.get('method'))
+    if method is None:
+        response = {'error': {'code': -32601,
+                              'message': 'method not found'}}
+    else:
+        try:
+            response = {'result': method(**request.get('params', {}))}
+        except Exception as e:
+            response = {'error': {'code': -32603, 'message': str(e)}}
+    response.update(jsonrpc='2.0', id=request.get('id'),
+                    latency=time.perf_counter() - start)
+    return response
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            request, error = parsed(line)
+            if error is None:
+                response = respond(request)
+            else:
+                response = {'jsonrpc': '2.0', 'id': None, 'error': error,
+                            'latency': 0}
+            print(f"{request.get('method')}: "
+                  f"{response['latency'] * 1000:.1f} ms", file=sys.stderr)
+            try:
+                self.wfile.write(json.dumps(response).encode() + b'\n')
+                self.wfile.flush()
+            except BrokenPipeError:
+                return  # the client gave up waiting
+
+
+class Server(socketserver.UnixStreamServer):
+    """serves one request at a time
+    the checks keep state between requests (the SUT modules, the cache)
+    and the timeout is an alarm, so there's no point in threading"""
+    def __init__(self, address=None):
+        address = address or fix_client.socket_path()
+        if os.path.exists(address):
+            # left over from a server that didn't shut down cleanly
+            os.unlink(address)
+        super().__init__(address, Handler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+if __name__ == '__main__':
+    assert len(sys.argv) <= 2
+    tracing.start_from_environment()
+    with Server(*sys.argv[1:]) as server:
+        print(f'listening on {server.server_address}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
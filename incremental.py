@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""keep the SUT module between checks and only execute what changed
+
+the fix loop changes a line or two of the SUT per iteration
+instead of executing the whole source again (and paying for its
+imports), only the top level statements that changed are executed
+anything that might have side effects means executing everything
+(functions that were only moved keep their old line numbers though)
+if the test changes the module, even in place, the next check
+starts from scratch"""
+
+import ast
+import copy
+import types
+import run_code
+
+# expressions that can be evaluated without running any code
+simple_nodes = (ast.Constant, ast.Name, ast.Attribute, ast.Tuple, ast.List,
+                ast.Set, ast.Dict, ast.Starred, ast.UnaryOp, ast.BinOp,
+                ast.BoolOp, ast.Compare, ast.expr_context, ast.operator,
+                ast.unaryop, ast.boolop, ast.cmpop, ast.keyword)
+harmless_decorators = ('staticmethod', 'classmethod', 'property')
+
+
+def simple(*nodes):
+    return all(isinstance(el, simple_nodes)
+               for node in nodes if node is not None
+               for el in ast.walk(node))
+
+
+def harmless_decorator(node):
+    return isinstance(node, ast.Name) and node.id in harmless_decorators
+
+
+def side_effect_free(node, in_class=False):
+    """executing the statement only defines names"""
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        # modules are only imported once per process
+        return True
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        arguments = node.args
+        return all(in_class and harmless_decorator(el)
+                   for el in node.decorator_list) \
+            and simple(node.returns, *arguments.defaults,
+                       *arguments.kw_defaults,
+                       *[el.annotation for el in arguments.args
+                         + arguments.posonlyargs + arguments.kwonlyargs])
+    if isinstance(node, ast.ClassDef):
+        return not node.decorator_list \
+            and simple(*node.bases, *node.keywords) \
+            and all(side_effect_free(el, True) for el in node.body)
+    if isinstance(node, (ast.Assign, ast.AnnAssign)):
+        targets = node.targets if isinstance(node, ast.Assign) \
+            else [node.target]
+        return all(isinstance(el, ast.Name) for el in targets) \
+            and simple(node.value)
+    return isinstance(node, ast.Pass) or \
+        (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant))
+
+
+def defined_names(node):
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef,
+                         ast.ClassDef)):
+        return [node.name]
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return [(el.asname or el.name).split('.')[0] for el in node.names]
+    return [el.id for el in ast.walk(node)
+            if isinstance(el, ast.Name) and isinstance(el.ctx, ast.Store)]
+
+
+def read_names(node):
+    """the names a statement reads while it's executed
+    function bodies only look their names up when they're called"""
+    if isinstance(node, ast.Name):
+        return {node.id} if isinstance(node.ctx, ast.Load) else set()
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        children = node.decorator_list + [node.args, node.returns]
+    elif isinstance(node, ast.Lambda):
+        children = [node.args]
+    else:
+        children = list(ast.iter_child_nodes(node))
+    return set().union(*[read_names(el) for el in children
+                         if el is not None])
+
+
+class Statement:
+    def __init__(self, node, lines):
+        self.node = node
+        start = min([node.lineno] + [el.lineno
+                                     for el in getattr(node,
+                                                       'decorator_list',
+                                                       [])])
+        self.text = '\n'.join(lines[start - 1:node.end_lineno])
+        self.names = defined_names(node)
+        self.reads = read_names(node)
+
+
+def statements(source_code):
+    lines = source_code.split('\n')
+    return [Statement(node, lines) for node in ast.parse(source_code).body]
+
+
+class Unknown:
+    """state that can't be copied, it never compares equal"""
+    def __eq__(self, other):
+        return False
+
+
+def snapshot(value, module, seen=()):
+    """something that compares equal as long as value isn't changed
+    not even in place: lists get appended to, classes get new attributes
+    things from other modules are only compared by identity,
+    a fresh check shares them, too"""
+    if isinstance(value, types.ModuleType) or id(value) in seen or \
+            (isinstance(value, (type, types.FunctionType))
+             and value.__module__ != module):
+        return id(value)
+    seen += (id(value),)
+    if isinstance(value, (staticmethod, classmethod)):
+        return snapshot(value.__func__, module, seen)
+    if isinstance(value, property):
+        return tuple(snapshot(el, module, seen)
+                     for el in (value.fget, value.fset, value.fdel))
+    if isinstance(value, types.FunctionType):
+        return (id(value),
+                snapshot(value.__defaults__, module, seen),
+                snapshot(value.__kwdefaults__, module, seen),
+                snapshot(vars(value), module, seen))
+    if isinstance(value, type):
+        return (id(value),
+                tuple((key, snapshot(el, module, seen))
+                      for key, el in vars(value).items()
+                      if key not in ('__dict__', '__weakref__')))
+    try:
+        return copy.deepcopy(value)
+    except Exception:
+        return Unknown()
+
+
+def state(module):
+    return {key: snapshot(value, module.__name__)
+            for key, value in vars(module).items()
+            if key != '__builtins__'}
+
+
+def unchanged(module, old):
+    try:
+        return state(module) == old
+    except Exception:
+        return False  # e.g. an __eq__ that raises
+
+
+class IncrementalCheck:
+    """behaves like run_code.check but keeps the SUT module around"""
+    def __init__(self, check=run_code.check):
+        self.check = check
+        self.reset()
+        self.full_loads = 0
+        self.partial_loads = 0
+
+    def reset(self):
+        self.name = None
+        self.module = None
+        self.statements = []
+        self.state = {}
+
+    def __call__(self, name, source_code, test_code, test_id=None):
+        res = self.check(name, source_code, test_code, test_id, self.load)
+        if self.module is not None and \
+                not unchanged(self.module, self.state):
+            # the test changed the SUT, so it has to start from scratch
+            self.reset()
+        return res
+
+    def load(self, name, source_code):
+        try:
+            new = statements(source_code)
+            if not self.patch(name, new):
+                self.module = run_code.load_source(name, source_code)
+                self.full_loads += 1
+        except BaseException:
+            self.reset()
+            raise
+        self.name = name
+        self.statements = new
+        self.state = state(self.module)
+        return self.module
+
+    def patch(self, name, new):
+        """execute the changed statements in the existing module
+        False if that's not possible or not safe"""
+        if self.module is None or name != self.name:
+            return False
+        old_texts = {el.text for el in self.statements}
+        new_texts = {el.text for el in new}
+        added = [el for el in new if el.text not in old_texts]
+        removed = [el for el in self.statements if el.text not in new_texts]
+        if not all(side_effect_free(el.node) for el in added + removed):
+            return False
+        changed = {el for statement in added + removed
+                   for el in statement.names}
+        kept = {el for statement in new if statement.text in old_texts
+                for el in set(statement.names) | statement.reads}
+        if changed & kept:
+            # the order of the statements would matter
+            # or a kept statement would still use the old value
+            return False
+        for el in changed:
+            self.module.__dict__.pop(el, None)
+        code = compile(ast.Module(body=[el.node for el in added],
+                                  type_ignores=[]),
+                       run_code.SOURCE_FILE, 'exec')
+        exec(code, self.module.__dict__)
+        self.partial_loads += 1
+        return True
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from utils import after_marker
+from matchers import register
 
 
 class InvalidImport:
@@ -15,9 +15,8 @@ class InvalidImport:
         return code
 
 
-def match_invalid_import(line):
-    parts = line.split("No module named '")
-    if len(parts) != 2:
+@register('ModuleNotFoundError')
+def match_invalid_import(failure, code):
+    if failure.name is None:
         return None
-    name = after_marker(parts)
-    return InvalidImport(name)
+    return InvalidImport(failure.name)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""a language server: fixes the test and its SUT from within the editor
+
+speaks the Language Server Protocol over stdin/stdout
+open documents are kept in memory and synced incrementally
+a fix runs on didSave or as a code action
+and comes back as minimal TextEdits for the test and the SUT
+a newer version of a file drops the fix that's running"""
+
+import os
+import re
+import sys
+import json
+import queue
+import difflib
+import pathlib
+import threading
+import urllib.parse
+from py import path
+import create_file
+import save_file
+import tracing
+from run_code import TargetedCheck
+
+
+def read_message(stream):
+    """the next message from a binary stream, None at the end of it
+    messages have a Content-Length header, then an empty line, then JSON"""
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        key, _, value = line.decode('ascii').partition(':')
+        if key.strip().lower() == 'content-length':
+            length = int(value)
+    if length is None:
+        raise ValueError('message without Content-Length')
+    return json.loads(stream.read(length))
+
+
+def write_message(stream, message):
+    body = json.dumps(message).encode()
+    stream.write(b'Content-Length: %d\r\n\r\n' % len(body) + body)
+    stream.flush()
+
+
+def uri_to_path(uri):
+    return urllib.parse.unquote(urllib.parse.urlparse(uri).path)
+
+
+def path_to_uri(name):
+    return pathlib.Path(str(name)).absolute().as_uri()
+
+
+def split_lines(text):
+    """like str.splitlines(keepends=True), but only \\n, \\r\\n and \\r end
+    a line in LSP, form feeds and the like don't"""
+    return [el for el in re.split(r'(?<=\r\n)|(?<=\n)|(?<=\r(?!\n))', text)
+            if el]
+
+
+def utf16_length(text):
+    """LSP counts characters in UTF-16 code units"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def offset(text, position):
+    """the index into text of an LSP position"""
+    lines = split_lines(text)
+    line = position['line']
+    if line >= len(lines):
+        return len(text)
+    start = sum(len(el) for el in lines[:line])
+    content = lines[line].rstrip('\r\n')
+    units = 0
+    for i, character in enumerate(content):
+        if units >= position['character']:
+            return start + i
+        units += utf16_length(character)
+    return start + len(content)
+
+
+def apply_change(text, change):
+    """a change from didChange, without a range it's the whole text"""
+    if 'range' not in change:
+        return change['text']
+    start = offset(text, change['range']['start'])
+    end = offset(text, change['range']['end'])
+    return text[:start] + change['text'] + text[end:]
+
+
+def position(lines, index):
+    """the LSP position of the start of lines[index]
+    past the last line, it's the end of the text"""
+    if index < len(lines) or not lines or lines[-1].endswith(('\n', '\r')):
+        return {'line': index, 'character': 0}
+    return {'line': len(lines) - 1, 'character': utf16_length(lines[-1])}
+
+
+def text_edits(old, new):
+    """TextEdits that turn old into new, only replacing changed lines"""
+    old_lines = split_lines(old)
+    new_lines = split_lines(new)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, False)
+    return [{'range': {'start': position(old_lines, i1),
+                       'end': position(old_lines, i2)},
+             'newText': ''.join(new_lines[j1:j2])}
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+            if tag != 'equal']
+
+
+def server_check():
+    import fix_server
+    from check_cache import CachedCheck
+    return CachedCheck(fix_server.server_check())
+
+
+class Superseded(Exception):
+    """a file changed while it was being fixed"""
+
+
+# messages that only change the documents, they're handled during a fix
+document_changes = ('textDocument/didOpen', 'textDocument/didChange',
+                    'textDocument/didClose')
+
+
+class LanguageServer:
+    """handles the messages, one at a time
+    the checks run in the main thread: they keep state between checks
+    (IncrementalCheck, the snapshots of sys.modules) and the timeout is
+    an alarm, so a thread reads the messages in the meantime
+    and the fix looks at the document changes between checks"""
+    def __init__(self, output, check=None):
+        self.output = output
+        self.check = check or server_check()
+        self.documents = {}
+        self.versions = {}
+        self.generations = {}  # uri -> number of changes
+        self.messages = queue.Queue()
+        self.deferred = []  # messages that arrived during a fix
+        self.request_id = 0
+        self.running = True
+
+    def handle(self, message):
+        method = message.get('method')
+        if method is None:
+            return  # the client's answer to one of our requests
+        handler = self.methods.get(method)
+        if handler is None:
+            if 'id' in message and not method.startswith('$/'):
+                self.respond(message['id'], error={
+                    'code': -32601, 'message': 'method not found'})
+            return
+        try:
+            result = handler(self, **message.get('params') or {})
+        except Superseded:
+            if 'id' in message:
+                self.respond(message['id'], error={
+                    'code': -32801, 'message': 'content modified'})
+            return
+        except Exception as e:
+            if 'id' in message:
+                self.respond(message['id'],
+                             error={'code': -32603, 'message': str(e)})
+            return
+        if 'id' in message:
+            self.respond(message['id'], result)
+
+    def respond(self, id, result=None, error=None):
+        response = {'jsonrpc': '2.0', 'id': id}
+        if error is None:
+            response['result'] = result
+        else:
+            response['error'] = error
+        write_message(self.output, response)
+
+    def request(self, method, params):
+        self.request_id += 1
+        write_message(self.output, {'jsonrpc': '2.0', 'id': self.request_id,
+                                    'method': method, 'params': params})
+
+    def initialize(self, **_):
+        return {'capabilities': {
+                    'textDocumentSync': {'openClose': True,
+                                         'change': 2,  # incremental
+                                         'save': {'includeText': False}},
+                    'codeActionProvider': True},
+                'serverInfo': {'name': 'greener-python'}}
+
+    def initialized(self, **_):
+        pass
+
+    def shutdown(self, **_):
+        return None
+
+    def exit(self, **_):
+        self.running = False
+
+    def changed(self, uri):
+        self.generations[uri] = self.generations.get(uri, 0) + 1
+
+    def did_open(self, textDocument):
+        self.documents[textDocument['uri']] = textDocument['text']
+        self.versions[textDocument['uri']] = textDocument.get('version')
+        self.changed(textDocument['uri'])
+
+    def did_change(self, textDocument, contentChanges):
+        uri = textDocument['uri']
+        text = self.documents.get(uri, '')
+        for change in contentChanges:
+            text = apply_change(text, change)
+        self.documents[uri] = text
+        self.versions[uri] = textDocument.get('version')
+        self.changed(uri)
+
+    def did_close(self, textDocument):
+        self.documents.pop(textDocument['uri'], None)
+        self.versions.pop(textDocument['uri'], None)
+        self.changed(textDocument['uri'])
+
+    def did_save(self, textDocument, text=None):
+        if text is not None:
+            self.documents[textDocument['uri']] = text
+            self.changed(textDocument['uri'])
+        edit = self.fix(textDocument['uri'])
+        if edit is not None:
+            self.request('workspace/applyEdit',
+                         {'label': 'greener python', 'edit': edit})
+
+    def code_action(self, textDocument, **_):
+        edit = self.fix(textDocument['uri'])
+        if edit is None:
+            return []
+        return [{'title': 'Fix test and source', 'kind': 'quickfix',
+                 'edit': edit}]
+
+    def read(self, file):
+        """the editor's buffer if it's open, otherwise the file"""
+        uri = path_to_uri(file)
+        if uri in self.documents:
+            return self.documents[uri]
+        return file.read() if file.check() else ''
+
+    def fix(self, uri):
+        """a WorkspaceEdit with the fix, None if nothing changes"""
+        name = uri_to_path(uri)
+        if not create_file.is_test_file(name):
+            return None
+        file = path.local(name)
+        source_file = create_file.source_file_name(file)
+        read = {}  # uri -> generation of the text the fix started with
+
+        def reading(file):
+            read[path_to_uri(file)] = self.generations.get(
+                path_to_uri(file), 0)
+            return self.read(file)
+
+        targeted = TargetedCheck(self.check)
+
+        def check(*args):
+            self.receive()
+            if any(self.generations.get(el, 0) != generation
+                   for el, generation in read.items()):
+                raise Superseded()
+            return targeted(*args)
+
+        with tracing.span('lsp fix', test=name):
+            files, _ = save_file.fixed_files(file, source_file, check,
+                                             reading)
+        changes = []
+        for el, old, new in files:
+            edits = text_edits(old, new)
+            if not edits:
+                continue
+            el_uri = path_to_uri(el)
+            if not el.check() and el_uri not in self.documents:
+                changes.append({'kind': 'create', 'uri': el_uri,
+                                'options': {'ignoreIfExists': True}})
+            changes.append({'textDocument': {
+                                'uri': el_uri,
+                                'version': self.versions.get(el_uri)},
+                            'edits': edits})
+        return {'documentChanges': changes} if changes else None
+
+    methods = {'initialize': initialize,
+               'initialized': initialized,
+               'shutdown': shutdown,
+               'exit': exit,
+               'textDocument/didOpen': did_open,
+               'textDocument/didChange': did_change,
+               'textDocument/didClose': did_close,
+               'textDocument/didSave': did_save,
+               'textDocument/codeAction': code_action}
+
+    def receive(self):
+        """handle the document changes that arrived during a fix
+        everything else waits until the fix is done"""
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                return
+            if message is not None and \
+                    message.get('method') in document_changes:
+                self.handle(message)
+            else:
+                self.deferred.append(message)
+
+    def next_message(self):
+        if self.deferred:
+            return self.deferred.pop(0)
+        return self.messages.get()
+
+    def read_messages(self, input):
+        while True:
+            try:
+                message = read_message(input)
+            except (OSError, ValueError):
+                message = None  # the stream is broken, stop
+            self.messages.put(message)
+            if message is None:
+                return
+
+    def run(self, input):
+        threading.Thread(target=self.read_messages, args=(input,),
+                         daemon=True).start()
+        while self.running:
+            message = self.next_message()
+            if message is None:
+                break
+            self.handle(message)
+
+
+if __name__ == '__main__':
+    assert len(sys.argv) == 1
+    tracing.start_from_environment()
+    # the messages go to stdout, anything else would corrupt them
+    output = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    sys.stdout = sys.stderr
+    LanguageServer(output).run(sys.stdin.buffer)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""registry that maps failures to the matchers that can deal with them
+
+matchers are indexed by the name of the exception type they handle
+an optional regular expression narrows them down to certain messages
+a matcher takes a run_code.Failure and the Code and returns an issue
+(anything with a fix method) or None if it doesn't apply after all
+
+third-party matchers register themselves without touching fix_code:
+
+    @matchers.register('ZeroDivisionError')
+    def match_division(failure, code):
+        ..."""
+
+import re
+import time
+
+
+class Timing:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+def matcher_name(matcher):
+    return f'{matcher.__module__}.{matcher.__qualname__}'
+
+
+class Registry:
+    def __init__(self):
+        # exception type -> [(compiled pattern or None, matcher)]
+        self.matchers = {}
+        self.timings = {}  # matcher name -> Timing
+
+    def add(self, exc_type, matcher, pattern=None):
+        compiled = re.compile(pattern) if pattern is not None else None
+        self.matchers.setdefault(exc_type, []).append((compiled, matcher))
+        self.timings.setdefault(matcher_name(matcher), Timing())
+        return matcher
+
+    def remove(self, exc_type, matcher):
+        self.matchers[exc_type] = [el for el in self.matchers[exc_type]
+                                   if el[1] is not matcher]
+
+    def candidates(self, failure):
+        """the matchers that might recognize the failure, in order"""
+        return [matcher
+                for pattern, matcher in self.matchers.get(failure.exc_type,
+                                                          [])
+                if pattern is None or pattern.search(failure.message)]
+
+    def match(self, failure, code):
+        """issue of the first matcher that recognizes the failure"""
+        for matcher in self.candidates(failure):
+            start = time.perf_counter()
+            res = matcher(failure, code)
+            timing = self.timings[matcher_name(matcher)]
+            timing.calls += 1
+            timing.seconds += time.perf_counter() - start
+            if res:
+                return res
+        return None
+
+    def report(self):
+        lines = [f'{name}: {timing.calls} calls, '
+                 f'{timing.seconds * 1000:.2f} ms'
+                 for name, timing in self.timings.items()]
+        return '\n'.join(lines)
+
+
+registry = Registry()
+
+
+def register(exc_type, pattern=None):
+    """decorator that adds a matcher to the global registry"""
+    def decorator(matcher):
+        return registry.add(exc_type, matcher, pattern)
+    return decorator
@@ -1,54 +1,69 @@
 #!/usr/bin/env python3
+import re
 import ast
-from utils import get_broken_line
+from matchers import register
 from utils import start_of_function_declaration
-from utils import line_with
-from utils import find_dedent
 
 
-def parses(text):
-    try:
-        ast.parse(text)
-        return True
-    except:  # noqa: E722
-        return False
+def qualified_name(message, marker):
+    parts = message.split(marker)
+    tmp = parts[0]
+    # newer versions of Python use the qualified name (Class.method)
+    return tmp.split(' ')[-1].split('.')
 
 
-def function_name(line, marker):
-    parts = line.split(marker)
-    tmp = parts[0]
-    return tmp.split(' ')[-1]
-
-
-def extract_relevant_call(function_name, broken_line):
-    # required to unpack stuff like this:
-    # self.assertEqual(fun(args), x)
-    parts = broken_line.split(function_name)
-    # assert len(parts) == 2
-    if len(parts) != 2:
-        # we're probably dealing with a constructor call
-        # in this case, the call contains the name of the class
-        # the error message, however, complains about __init__
-        # let's just strip the leading whitespace and hope that's enough...
-        return broken_line.lstrip()
-    res = parts[1]
-    # now res should be something like
-    # (args), x)
-    assert res[0] == '('
-    # prepend function name to turn it back into a function call
-    # we could also parse it as a list but that might spell trouble
-    # consider corner cases like (1) which evaluates to 1, not to (1,)
-    res = function_name + res
-    # we still have to get rid of the trailing
-    # , x)
-    # which may be arbitrarily complex
-    # to get rid of it, we simlpy check substrings of increasing length
-    # - until we find one that parses
-    # we start with "fun(", which should fail to parse
-    n = len(function_name) + 1
-    while not parses(res[:n]):
-        n += 1
-    return res[:n]
+def function_name(message, marker):
+    return qualified_name(message, marker)[-1]
+
+
+def owner_name(message, marker):
+    """the class of a method, if the message tells us"""
+    res = qualified_name(message, marker)
+    return res[-2] if len(res) >= 2 else None
+
+
+def called_name(call):
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    if isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    return None
+
+
+def position(node):
+    return node.lineno, node.col_offset
+
+
+def find_call(calls, function_name, owner=None):
+    """the first call of function_name
+    constructor calls contain the name of the class (owner)
+    the error message, however, complains about __init__"""
+    name = owner if function_name == '__init__' else function_name
+    for call in sorted(calls, key=position):
+        if called_name(call) == name:
+            return call
+    if function_name == '__init__' and calls:
+        # we don't know the class, so the outermost call has to do
+        return min(calls, key=position)
+    return None
+
+
+def calls_in(tree, lineno=None):
+    """the calls in the tree, only those on line lineno if given"""
+    return [node for node in ast.walk(tree)
+            if isinstance(node, ast.Call)
+            and (lineno is None or node.lineno <= lineno <= node.end_lineno)]
+
+
+def relevant_call(test, failure, function_name, owner=None):
+    """the ast.Call that caused the failure
+    lineno and colno of the failure point right at it
+    without colno, we pick the first fitting call in that line"""
+    calls = calls_in(ast.parse(test), failure.lineno)
+    exact = [el for el in calls if position(el) == (failure.lineno,
+                                                    failure.colno)]
+    return find_call(exact, function_name, owner) \
+        or find_call(calls, function_name, owner)
 
 
 def print_keyword_argument(arg):
@@ -57,24 +72,10 @@ def print_keyword_argument(arg):
     return f"{arg.arg}=1"
 
 
-def get_arguments(function_name, broken_line):
-    res = ast.parse(extract_relevant_call(function_name, broken_line))
-    body = res.body[0]
-    args = body.value.args
-    keywords = body.value.keywords
-    return [el.id if type(el) is ast.Name else "1" for el in args] +\
-           [print_keyword_argument(el) for el in keywords]
-
-
-def is_method(name, source):
-    stub = start_of_function_declaration(name)
-    lines = source.split('\n')
-    pos = line_with(lines, stub)
-    pos = pos - find_dedent(lines[pos::-1])
-    if pos < 0:
-        # cannot be part of a class because we've run out of code
-        return False
-    return lines[pos].lstrip().startswith('class')
+def call_arguments(call):
+    """arguments of an ast.Call as they'd appear in a function definition"""
+    return [el.id if type(el) is ast.Name else "1" for el in call.args] +\
+           [print_keyword_argument(el) for el in call.keywords]
 
 
 def starting_at(marker, text):
@@ -86,22 +87,43 @@ class MissingArgument:
                '() got an unexpected keyword argument ',
                '() got multiple values for argument')
 
-    def __init__(self, name, args):
+    def __init__(self, name, args, owner=None, self_argument=None):
         self.name = name
         self.args = args
+        self.owner = owner  # class of the method, if we know it
+        # None: methods get a self argument, functions don't
+        self.self_argument = self_argument
+
+    def alternatives(self):
+        """static methods don't need self, functions might be methods"""
+        return [MissingArgument(self.name, self.args, self.owner, el)
+                for el in (False, True)]
 
     def fix(self, code):
-        if is_method(self.name, code.source):
-            # method -> add self argument
-            self.args.insert(0, 'self')
-        stub = start_of_function_declaration(self.name)
-        if stub not in code.source:
+        symbols = code.symbols
+        function = symbols and symbols.first('def', self.name, self.owner)
+        if function is None:
             return code
-        parts = code.source.split(stub)
-        assert len(parts) == 2
-        stub_with_arg = stub + ', '.join(self.args)
-        new_content = parts[0] + stub_with_arg + starting_at('):', parts[1])
-        return code.with_changed_source(new_content)
+        args = self.args
+        self_argument = self.self_argument
+        if self_argument is None:
+            self_argument = function.owner is not None
+        if self_argument:
+            args = ['self'] + args
+        stub = start_of_function_declaration(self.name)
+        start = function.start
+        lines = code.source_lines
+        # the declaration might span several lines
+        end = start
+        while end < len(lines) - 1 and '):' not in lines[end]:
+            end += 1
+        declaration = '\n'.join(lines[start:end + 1])
+        parts = declaration.split(stub, 1)
+        stub_with_arg = stub + ', '.join(args)
+        new_declaration = parts[0] + stub_with_arg \
+            + starting_at('):', parts[1])
+        return code.with_changed_lines(start, end + 1,
+                                       new_declaration.split('\n'))
 
 
 def arg_marker_type(line):
@@ -132,17 +154,15 @@ def fix_literals(args):
     return res
 
 
-class MissingArgumentMatcher:
-    def __init__(self, test):
-        self.previous_line = ""
-        self.test = test
-
-    def __call__(self, line):
-        marker = arg_marker_type(line)
-        if marker:
-            name = function_name(line, marker)
-            broken_line = get_broken_line(self.test, self.previous_line)
-            args = get_arguments(name, broken_line)
-            return MissingArgument(name, fix_literals(args))
-        self.previous_line = line
+@register('TypeError', '|'.join(re.escape(el)
+                                for el in MissingArgument.markers))
+def match_missing_argument(failure, code):
+    if failure.lineno is None:
+        return None
+    marker = arg_marker_type(failure.message)
+    name = function_name(failure.message, marker)
+    owner = owner_name(failure.message, marker)
+    call = relevant_call(code.test, failure, name, owner)
+    if call is None:
         return None
+    return MissingArgument(name, fix_literals(call_arguments(call)), owner)
@@ -1,7 +1,5 @@
 #!/usr/bin/env python3
-from utils import before_marker
-from utils import after_marker
-from utils import line_with_init
+from matchers import register
 from utils import indentation
 
 
@@ -9,20 +7,22 @@ class MissingAttribute:
     def __init__(self, class_name, attribute_name):
         self.class_name = class_name
         self.attribute_name = attribute_name
+        # fix_code compares names to see if fixing made progress
+        self.name = f'{class_name}.{attribute_name}'
 
     def fix(self, code):
-        lines = code.source.split('\n')
-        index = line_with_init(lines, self.class_name)
-        pos = index + 1  # insert attribute here
-        indent = indentation(lines[pos])
-        lines.insert(pos, f'{indent}self.{self.attribute_name} = None')
-        return code.with_changed_source('\n'.join(lines))
+        symbols = code.symbols
+        init = symbols and symbols.get('def', '__init__', self.class_name)
+        if init is None:
+            return code
+        pos = init.start + 1  # insert attribute here
+        indent = indentation(code.source_lines[pos])
+        return code.with_inserted_lines(
+            pos, [f'{indent}self.{self.attribute_name} = None'])
 
 
-def match_missing_attribute(line):
-    parts = line.split("' object has no attribute '")
-    if len(parts) != 2:
+@register('AttributeError')
+def match_missing_attribute(failure, code):
+    if failure.obj_kind != 'instance':
         return None
-    class_name = before_marker(parts)
-    attribute_name = after_marker(parts)
-    return MissingAttribute(class_name, attribute_name)
+    return MissingAttribute(failure.obj_name, failure.name)
@@ -1,78 +1,81 @@
 #!/usr/bin/env python3
+from matchers import register
 import textwrap
 from utils import name_of_called_object
+from utils import get_broken_line
 from utils import function_declaration
-from utils import line_with_init
 from utils import indentation
-from utils import find_dedent
-from utils import line_with
 
 
 def is_class_name(name):
     return name[0].isupper()
 
 
+def is_stub(code, symbol, stub):
+    """is the symbol defined by a line like x = None?"""
+    return symbol is not None \
+        and code.source_lines[symbol.start].strip() == stub
+
+
 class MissingFunction:
     method_marker = 'self.'
 
     def __init__(self, name):
         self.name = name
 
+    def alternatives(self):
+        """what else the called object might be"""
+        return [MissingClass(self.name)]
+
     def fix(self, code):
-        variable_stub = f'{self.name} = None\n'
-        if variable_stub not in code.source:
+        variable_stub = f'{self.name} = None'
+        if code.symbols is None:
             return code
-        parts = code.source.split(variable_stub)
-        assert len(parts) == 2
-        if parts[0].endswith(self.method_marker):
-            return self.convert_to_method(code)
-        function_stub = function_declaration(self.name) + "\n    pass\n"
-        new_content = parts[0] + function_stub + parts[1]
-        return code.with_changed_source(new_content)
-
-    def convert_to_method(self, code):
-        lines = code.source.split('\n')
-        init_pos = line_with_init(lines)
-        indent = indentation(lines[init_pos])
-        start = init_pos + 1
-        end_of_init = find_dedent(lines[start:]) + start
-        lines[end_of_init:end_of_init] = [f'{indent}def {self.name}():',
-                                          f'{indent}    pass']
-        offending_line = line_with(lines, f'self.{self.name} = None')
-        del lines[offending_line]
-        new_content = '\n'.join(lines)
-        return code.with_changed_source(new_content)
+        variable = code.symbols.get('variable', self.name)
+        if is_stub(code, variable, variable_stub):
+            function_stub = [function_declaration(self.name), '    pass']
+            return code.with_changed_lines(variable.start, variable.end,
+                                           function_stub)
+        attribute = code.symbols.first('attribute', self.name)
+        if is_stub(code, attribute, self.method_marker + variable_stub):
+            return self.convert_to_method(code, attribute)
+        return code
+
+    def convert_to_method(self, code, attribute):
+        """the attribute (a symbols.Symbol) becomes a method"""
+        init = code.symbols.scope(attribute.start, attribute.indent)
+        lines = code.source_lines
+        indent = indentation(lines[init.start])
+        res = code.with_inserted_lines(init.end,
+                                       [f'{indent}def {self.name}():',
+                                        f'{indent}    pass'])
+        return res.with_deleted_lines(attribute.start, attribute.end)
 
 
 class MissingClass:
     def __init__(self, name):
         self.name = name
 
+    def alternatives(self):
+        return [MissingFunction(self.name)]
+
     def fix(self, code):
-        variable_stub = f'{self.name} = None\n'
-        if variable_stub not in code.source:
+        variable = code.symbols and code.symbols.get('variable', self.name)
+        if not is_stub(code, variable, f'{self.name} = None'):
             return code
-        parts = code.source.split(variable_stub)
-        assert len(parts) == 2
+        i = variable.start
         class_stub = textwrap.dedent(f"""
             class {self.name}:
                 def __init__(self):
-                    pass
-            """)
-        new_content = parts[0] + class_stub + parts[1]
-        return code.with_changed_source(new_content)
-
-
-class MissingFunctionMatcher:
-    def __init__(self, test):
-        self.previous_line = ""
-        self.test = test
-
-    def __call__(self, line):
-        if 'object is not callable' in line:
-            name = name_of_called_object(self.test, self.previous_line)
-            if is_class_name(name):
-                return MissingClass(name)
-            return MissingFunction(name)
-        self.previous_line = line
+                    pass""")
+        return code.with_changed_lines(i, i + 1, class_stub.split('\n'))
+
+
+@register('TypeError', 'object is not callable')
+def match_missing_function(failure, code):
+    if failure.lineno is None:
         return None
+    name = name_of_called_object(get_broken_line(code.test, failure.lineno))
+    if is_class_name(name):
+        return MissingClass(name)
+    return MissingFunction(name)
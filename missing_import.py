@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from utils import before_marker
+from matchers import register
 
 
 class MissingImport:
@@ -10,11 +10,8 @@ class MissingImport:
         return code.with_changed_test(f'import {self.name}\n\n\n' + code.test)
 
 
-def match_missing_import(line):
-    # do not require the prefix NameError
-    # you only get that when the unittest could be started!
-    parts = line.split("' is not defined")
-    if len(parts) != 2:
+@register('NameError')
+def match_missing_import(failure, code):
+    if failure.name is None:
         return None
-    name = before_marker(parts, start="name '")
-    return MissingImport(name)
+    return MissingImport(failure.name)
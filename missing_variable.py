@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from utils import after_marker
+from matchers import register
 
 
 class MissingVariable:
@@ -7,13 +7,13 @@ class MissingVariable:
         self.name = name
 
     def fix(self, code):
-        return code.with_changed_source(f'{self.name} = None\n\n\n'
-                                        + code.source)
+        return code.with_inserted_lines(0, [f'{self.name} = None', '', ''])
 
 
-def match_missing_variable(line):
-    parts = line.split("has no attribute '")
-    if len(parts) != 2:
+@register('AttributeError')
+def match_missing_variable(failure, code):
+    # attributes of classes also end up here
+    # the SUT gets a variable, which at least lets the fix loop continue
+    if failure.obj_kind not in ('module', 'class'):
         return None
-    name = after_marker(parts)
-    return MissingVariable(name)
+    return MissingVariable(failure.name)
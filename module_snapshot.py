@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""keep installed modules loaded between checks, forget the project's
+
+a test (or the SUT) that imports numpy shouldn't pay for it on every
+check, but a module from the project might have changed since the last
+check, so it has to be imported again
+after each check, the modules it imported from outside the installed
+libraries are evicted from sys.modules, and modules it replaced are
+put back; everything else stays loaded"""
+
+import os
+import sys
+import site
+import sysconfig
+import run_code
+
+
+def installed_directories():
+    """where the standard library and third party libraries live"""
+    paths = sysconfig.get_paths()
+    res = {paths[el] for el in ('stdlib', 'platstdlib', 'purelib',
+                                'platlib')}
+    res.update(site.getsitepackages())
+    res.add(site.getusersitepackages())
+    return tuple(os.path.join(os.path.realpath(el), '') for el in res)
+
+
+installed = installed_directories()
+
+
+def module_file(module):
+    """the file (or directory for namespace packages) of a module"""
+    file = getattr(module, '__file__', None)
+    if file is None:
+        file = next(iter(getattr(module, '__path__', None) or []), None)
+    return file
+
+
+def from_project(module, keep=()):
+    """False for builtins, installed libraries and whitelisted names"""
+    name = getattr(module, '__name__', None) or ''
+    if any(name == el or name.startswith(el + '.') for el in keep):
+        return False
+    file = module_file(module)
+    if file is None:
+        return False
+    return not os.path.realpath(file).startswith(installed)
+
+
+class Snapshot:
+    """sys.modules before a check"""
+    def __init__(self, keep=()):
+        self.modules = dict(sys.modules)
+        self.keep = keep
+
+    def restore(self):
+        """evicts the project's modules that were imported since"""
+        for name, module in list(sys.modules.items()):
+            old = self.modules.get(name)
+            if old is module:
+                continue
+            if old is not None:
+                sys.modules[name] = old
+            elif from_project(module, self.keep):
+                del sys.modules[name]
+        for name, module in self.modules.items():
+            sys.modules.setdefault(name, module)
+
+
+class IsolatedCheck:
+    """behaves like check but doesn't leave project modules behind
+    keep names packages that stay loaded even if they're not installed
+    (e.g. large internal packages that don't change)"""
+    def __init__(self, check=run_code.check, keep=()):
+        self.check = check
+        self.keep = tuple(keep)
+
+    def __call__(self, *args, **kwargs):
+        snapshot = Snapshot(self.keep)
+        try:
+            return self.check(*args, **kwargs)
+        finally:
+            snapshot.restore()
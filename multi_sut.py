@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""fix tests that import several modules of the project
+
+every project module the test imports is a SUT of its own
+a failure is fixed in the module it's about, the fix loop is the same
+as in fix_code otherwise"""
+
+import ast
+import os
+from code import Code
+import run_code
+import fix_code
+import static_analysis
+
+
+def local_imports(test, directory):
+    """names of the modules next to each other in directory
+    that the test imports, in the order of the imports"""
+    tree = static_analysis.parsed(test)
+    if tree is None:
+        return []
+    res = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                name = alias.name
+                if alias.asname is None and '.' not in name \
+                        and name not in res \
+                        and os.path.isfile(os.path.join(directory,
+                                                        name + '.py')):
+                    res.append(name)
+    return res
+
+
+class Project:
+    """a test and the sources of its SUTs, the first one is the main SUT"""
+    def __init__(self, test, sources):
+        self.test = test
+        self.sources = dict(sources)  # name -> source
+
+    def main(self):
+        return next(iter(self.sources))
+
+    def code(self, name):
+        return Code(name, self.test, self.sources[name])
+
+    def with_code(self, code):
+        """the project with the test and the source of code"""
+        sources = dict(self.sources)
+        sources[code.name] = code.source
+        return Project(code.test, sources)
+
+
+def target(failure, issue, project):
+    """the module the issue has to be fixed in"""
+    if failure.obj_name in project.sources and failure.obj_kind == 'module':
+        return failure.obj_name
+    for name in project.sources:
+        code = project.code(name)
+        if failure.obj_kind == 'class' and code.symbols is not None \
+                and code.symbols.get('class', failure.obj_name):
+            return name
+    # fixes don't change modules that don't have the symbol they fix
+    for name in project.sources:
+        code = project.code(name)
+        if fix_code.changed(code, issue.fix(code)):
+            return name
+    return project.main()
+
+
+def problem(project, check):
+    """the issue and the module it is about, (None, None) if it passes"""
+    failure = check(tuple(project.sources), tuple(project.sources.values()),
+                    project.test)
+    if not failure:
+        return None, None
+    issue = fix_code.matching_issue(failure, project.code(project.main()))
+    if type(issue) in fix_code.unfixable:
+        return issue, project.main()
+    return issue, target(failure, issue, project)
+
+
+def stubbed(project):
+    """static stubs for every SUT, project itself if there are none"""
+    res = project
+    for name in project.sources:
+        code = res.code(name)
+        new_code = static_analysis.stubbed(code)
+        if new_code is not code:
+            res = res.with_code(new_code)
+    return res
+
+
+def fixed_project(broken, check=None):
+    """the fixed project and the issue that's left (None if it passes)
+    check gets tuples of names and sources, like run_code.check"""
+    check = check or run_code.TargetedCheck()
+    project = stubbed(broken)
+    issue, name = problem(project, check)
+    if project is not broken and not issue \
+            and not all(static_analysis.defines_nothing(broken.code(el))
+                        for el in broken.sources) \
+            and not problem(broken, check)[0]:
+        # the stubs only shadow definitions we can't see
+        return broken, None
+    if project is not broken and type(issue) is fix_code.JustBroken:
+        # the static stubs broke something, so don't trust them
+        project = broken
+        issue, name = problem(project, check)
+    while issue and type(issue) not in fix_code.unfixable:
+        new_project = project.with_code(issue.fix(project.code(name)))
+        new_issue, new_name = problem(new_project, check)
+        if new_name == name and not fix_code.improved(issue, new_issue):
+            break
+        project, issue, name = new_project, new_issue, new_name
+    return project, issue
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+from matchers import register
+
+kinds = {'TimeoutError': 'timed out',
+         'MemoryError': 'out of memory',
+         'WorkerDied': 'crashed'}
+
+
+class ResourceLimit:
+    """the check hit a limit, changing the code won't help"""
+    def __init__(self, name, message):
+        self.name = name
+        self.message = message
+
+    def fix(self, code):
+        return code
+
+
+@register('TimeoutError')
+@register('MemoryError')
+@register('WorkerDied')
+def match_resource_limit(failure, code):
+    return ResourceLimit(kinds[failure.exc_type], failure.message)
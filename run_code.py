@@ -1,52 +1,477 @@
-import textwrap
-# we actually do use sys but this is not obvious to flake8
-import sys  # noqa: F401
+import os
+import sys
+import time
+import pickle
+import select
+import signal
+import threading
+import traceback
+import unittest
+import contextlib
+import importlib.abc
+import importlib.util
+from types import ModuleType
+import tracing
+from code_cache import compiled
 
-source = [None]
-source_name2 = [None]
-test = [None]
+# file names for the compiled code
+# they tell us which frames of a traceback belong to the test
+TEST_FILE = '<test>'
+SOURCE_FILE = '<SUT>'
 
 
-g = globals()
-local_variables = locals()
+class Failure:
+    """the first error of a check
+    only contains plain data, so it can be sent to other processes"""
+    def __init__(self, exc_type, message, traceback='', test_id=None,
+                 name=None, obj_kind=None, obj_name=None,
+                 lineno=None, colno=None):
+        self.exc_type = exc_type  # name of the exception class
+        self.message = message
+        self.traceback = traceback
+        self.test_id = test_id
+        # name and obj of AttributeError, NameError and ImportError
+        # obj_kind is one of 'module', 'class', 'instance'
+        self.name = name
+        self.obj_kind = obj_kind
+        self.obj_name = obj_name
+        # position of the offending code in the test (counting from 1)
+        self.lineno = lineno
+        self.colno = colno
 
+    def __eq__(self, other):
+        return type(other) is Failure and vars(self) == vars(other)
 
-def check(name, source_code, test_code):
+    def __repr__(self):
+        return f'Failure({self.exc_type}: {self.message})'
+
+
+def describe_obj(obj):
+    if isinstance(obj, ModuleType):
+        return 'module', obj.__name__
+    if isinstance(obj, type):
+        return 'class', obj.__name__
+    return 'instance', type(obj).__name__
+
+
+def describe(exception, text=None, test_id=None):
+    """Failure for the exception
+    text is the formatted traceback if we already have one"""
+    if text is None:
+        text = ''.join(traceback.format_exception(
+            type(exception), exception, exception.__traceback__))
+    res = Failure(type(exception).__name__, str(exception), text, test_id,
+                  name=getattr(exception, 'name', None))
+    if hasattr(exception, 'obj'):
+        res.obj_kind, res.obj_name = describe_obj(exception.obj)
+    frames = [frame
+              for frame in traceback.extract_tb(exception.__traceback__)
+              if frame.filename == TEST_FILE]
+    if frames:
+        res.lineno = frames[-1].lineno
+        res.colno = getattr(frames[-1], 'colno', None)
+    return res
+
+
+class Result(unittest.TestResult):
+    """remembers a Failure for every error"""
+    def __init__(self):
+        super().__init__()
+        self.failures_of_errors = []
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self.failures_of_errors.append(
+            describe(err[1], self.errors[-1][1], relative_id(test)))
+
+    def addPlainError(self, test_id, exception):
+        """an error in a plain test function, see run_plain_tests"""
+        self.failures_of_errors.append(describe(exception, test_id=test_id))
+
+
+class StopAtFirstError(Result):
+    """like failfast but failing assertions don't stop the run
+    we're only interested in errors, so we can stop at the first one"""
+    def addError(self, test, err):
+        super().addError(test, err)
+        self.stop()
+
+    def addPlainError(self, test_id, exception):
+        super().addPlainError(test_id, exception)
+        self.stop()
+
+
+def relative_id(test):
+    """id of the test relative to the test module
+    None if the error doesn't belong to a single test (e.g. setUpClass)"""
+    if not isinstance(test, unittest.TestCase):
+        return None
+    return test.id().split('.', 1)[1]
+
+
+def contains_test(module, test_id):
+    obj = module
+    for part in test_id.split('.'):
+        if not hasattr(obj, part):
+            return False
+        obj = getattr(obj, part)
+    return True
+
+
+def is_test_case(obj):
+    return isinstance(obj, type) and issubclass(obj, unittest.TestCase)
+
+
+def load_tests(module, test_id):
+    """the unittest tests, see plain_tests for the others"""
+    loader = unittest.defaultTestLoader
+    if test_id is not None and contains_test(module, test_id):
+        if not is_test_case(getattr(module, test_id.split('.')[0])):
+            return unittest.TestSuite()  # it's a plain test
+        return loader.loadTestsFromName(test_id, module)
+    # no test given or the test is gone -> run all of them
+    return loader.loadTestsFromModule(module)
+
+
+def without_arguments(function, bound=0):
+    """fixtures are pytest's business, we can only call plain tests"""
+    code = getattr(function, '__code__', None)
+    if code is None:
+        return False
+    defaults = len(getattr(function, '__defaults__', None) or ())
+    return code.co_argcount - bound - defaults == 0
+
+
+def collectable(cls):
+    """like pytest, skip classes that can't be created without arguments"""
+    return cls.__init__ is object.__init__ and cls.__new__ is object.__new__
+
+
+def plain_tests(module, test_id=None):
+    """(test id, class or None, name) of pytest style tests:
+    test_* functions and the test_* methods of Test* classes
+    that aren't unittest.TestCases, in the order they're defined"""
+    res = []
+    for name, obj in list(vars(module).items()):
+        if name.startswith('test_') and callable(obj) \
+                and without_arguments(obj):
+            res.append((name, None, name))
+        elif name.startswith('Test') and isinstance(obj, type) \
+                and not is_test_case(obj) and collectable(obj):
+            res += [(f'{name}.{el}', obj, el) for el, method
+                    in vars(obj).items()
+                    if el.startswith('test_') and callable(method)
+                    and without_arguments(method, bound=1)]
+    if test_id is not None and contains_test(module, test_id):
+        return [el for el in res if el[0] == test_id]
+    return res
+
+
+def run_plain_test(cls, name, module):
+    if cls is None:
+        return getattr(module, name)()
+    # like pytest, every test gets its own instance
+    instance = cls()
+    if hasattr(instance, 'setup_method'):
+        instance.setup_method(getattr(instance, name))
+    try:
+        getattr(instance, name)()
+    finally:
+        if hasattr(instance, 'teardown_method'):
+            instance.teardown_method(getattr(instance, name))
+
+
+def run_plain_tests(module, result, test_id=None):
+    """runs the tests directly, no loader, no suites
+    failing asserts are fine, errors go to the result"""
+    for id, cls, name in plain_tests(module, test_id):
+        if result.shouldStop:
+            return
+        try:
+            run_plain_test(cls, name, module)
+        except AssertionError:
+            pass
+        except Exception as e:
+            result.addPlainError(id, e)
+
+
+def load_source(name, source_code):
+    """the SUT as a fresh module"""
+    SUT = ModuleType(name)
+    exec(compiled(source_code, SOURCE_FILE), SUT.__dict__)
+    return SUT
+
+
+def test_text(name, test_code):
+    """the test without the import of the SUT
+    and whether there was one"""
     tmp = test_code.split("\n")
     SUT_import = f"import {name}"
     contains_SUT_import = True in [SUT_import in el for el in tmp]
-    tmp = [el for el in tmp if SUT_import not in el]
-    test[0] = '\n'.join(tmp)
-    source[0] = source_code
-    source_name2.insert(0, name)
-    local_variables.pop(source_name2[0], None)
-    # make sure you don't include unittest
+    # blank out the import instead of removing it
+    # this way, the line numbers still match the original test
+    tmp = [el if SUT_import not in el else '' for el in tmp]
+    return '\n'.join(tmp), contains_SUT_import
+
+
+def sut_modules(name, source_code):
+    """(name, source) of each SUT
+    name and source_code are tuples if the test imports several SUTs"""
+    if isinstance(name, tuple):
+        return list(zip(name, source_code))
+    return [(name, source_code)]
+
+
+class SourceFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """imports the SUTs from memory instead of from disk"""
+    def __init__(self, suts, load):
+        self.sources = dict(suts)
+        self.load = load
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname in self.sources:
+            return importlib.util.spec_from_loader(fullname, self)
+        return None
+
+    def create_module(self, spec):
+        return self.load(spec.name, self.sources[spec.name])
+
+    def exec_module(self, module):
+        pass  # load already executed it
+
+
+# sys.modules is shared by all threads
+installing = threading.Lock()
+
+
+@contextlib.contextmanager
+def installed(suts, load):
+    """the SUTs are in sys.modules while the tests run
+    so SUTs that import each other and the test share one module per SUT
+    whatever was in sys.modules before is put back afterwards"""
+    finder = SourceFinder(suts, load)
+    with installing:
+        saved = {sut: sys.modules.pop(sut) for sut, _ in suts
+                 if sut in sys.modules}
+        sys.meta_path.insert(0, finder)
+        try:
+            yield
+        finally:
+            sys.meta_path.remove(finder)
+            for sut, _ in suts:
+                sys.modules.pop(sut, None)
+            sys.modules.update(saved)
+
+
+class ImportRecorder(importlib.abc.MetaPathFinder):
+    """remembers the (name, path) of every module imported while it's active
+    it doesn't find anything itself, the other finders do the importing"""
+    def __init__(self):
+        self.imports = []
+
+    def find_spec(self, fullname, path=None, target=None):
+        self.imports.append((fullname, tuple(path) if path else None))
+        return None
+
+    def __enter__(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.meta_path.remove(self)
+
+
+def recorders():
+    return [el for el in sys.meta_path if isinstance(el, ImportRecorder)]
+
+
+def execute(name, source_code, test_code, result, test_id=None,
+            load=load_source):
+    """the failures of running the tests
+    a single failure if they couldn't be run at all"""
+    suts = sut_modules(name, source_code)
+    text = test_code
+    imported = []
+    for sut, source in suts:
+        text, contains_SUT_import = test_text(sut, text)
+        if contains_SUT_import:
+            imported.append((sut, source))
+    # every check gets fresh modules, so nothing leaks between checks
+    # in particular, the test doesn't see unittest unless it imports it
     # this way, we notice if the test code forgets to include it
-    # I couldn't find a way to unittest this
-    # probably because unittest is imported practically  everywhere
-    # also, imports seem to leak like crazy
-    # apparently, I haven't fully understood Python's module system
-    code = textwrap.dedent("""
-        from types import ModuleType
-
-        """)
-    if contains_SUT_import:
-        code += textwrap.dedent(f"""
-            {source_name2[0]} = ModuleType(source_name2[0])
-            exec(source[0], globals(), {source_name2[0]}.__dict__)
-            """)
-    code += textwrap.dedent("""
-        exec(test[0], globals(), locals())
-        suite = unittest.defaultTestLoader.loadTestsFromModule(
-            sys.modules[__name__])
-        res = unittest.TestResult()
-        suite.run(res)
-        """)
+    test_module = ModuleType(f'test_{suts[0][0]}')
+    several = len(suts) > 1
     try:
-        exec(code, g, local_variables)
+        with installed(suts, load) if several else contextlib.nullcontext():
+            for sut, source in imported:
+                test_module.__dict__[sut] = importlib.import_module(sut) \
+                    if several else load(sut, source)
+            exec(compiled(text, TEST_FILE), test_module.__dict__)
+            suite = load_tests(test_module, test_id)
+            suite.run(result)
+            run_plain_tests(test_module, result, test_id)
     except Exception as e:
-        return str(e)
-    tmp = local_variables['res'].errors
-    if tmp:
-        return tmp[0][1]
-    return None
+        return [describe(e)]
+    return result.failures_of_errors
+
+
+def check(name, source_code, test_code, test_id=None, load=load_source):
+    """the first error as a Failure, None if there are no errors
+    test_id restricts the run to a single test
+    load turns the source into the SUT module
+    name and source_code may be tuples, see multi_sut"""
+    with tracing.span('run', test_id=test_id) as span:
+        res = execute(name, source_code, test_code, StopAtFirstError(),
+                      test_id, load)
+        span.set(failure=res[0].exc_type if res else None)
+    return res[0] if res else None
+
+
+def check_all(name, source_code, test_code):
+    """the first error of every test, in the order check would see them"""
+    return execute(name, source_code, test_code, Result())
+
+
+class TargetedCheck:
+    """behaves like check but only re-runs the test that failed last time
+    once that test passes, all tests run again to confirm
+    check is the function that does the actual work"""
+    def __init__(self, check=check):
+        self.check = check
+        self.test_id = None
+
+    def __call__(self, name, source_code, test_code):
+        if self.test_id is not None:
+            res = self.check(name, source_code, test_code, self.test_id)
+            if res:
+                return res
+        res = self.check(name, source_code, test_code)
+        self.test_id = res.test_id if res else None
+        return res
+
+
+def run_limited(writer, check, args, kwargs, max_memory=None):
+    """runs in the forked child, sends the result through writer"""
+    try:
+        if max_memory is not None:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+        try:
+            res = check(*args, **kwargs)
+        except MemoryError:
+            # the SUT itself ran out of memory, not one of the tests
+            res = Failure('MemoryError', 'check ran out of memory')
+        # the parent's ImportRecorders should hear about the imports, too
+        data = pickle.dumps((res, [el.imports for el in recorders()]))
+        with os.fdopen(writer, 'wb') as file:
+            file.write(data)
+    finally:
+        # don't run any cleanup that belongs to the parent
+        os._exit(0)
+
+
+def read_until(reader, deadline=None):
+    """everything until the end of the pipe, None if that takes too long"""
+    chunks = []
+    while True:
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+        ready, _, _ = select.select([reader], [], [], remaining)
+        if ready:
+            chunk = os.read(reader, 64 * 1024)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+
+def precompile(name, source_code, test_code):
+    """fill the code cache, so that it outlives forked children"""
+    try:
+        for sut, source in sut_modules(name, source_code):
+            compiled(source, SOURCE_FILE)
+            test_code = test_text(sut, test_code)[0]
+        compiled(test_code, TEST_FILE)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        pass  # the check will report it
+
+
+class LimitedCheck:
+    """behaves like check but runs it in a forked process
+    that is killed after timeout seconds (None: no timeout)
+    and can't use more than max_memory bytes of address space
+    whatever state check keeps (e.g. IncrementalCheck) stays in the child
+    except for what ImportRecorders record"""
+    def __init__(self, check=check, timeout=10, max_memory=None):
+        self.check = check
+        self.timeout = timeout
+        self.max_memory = max_memory
+
+    def __call__(self, name, source_code, test_code, *args, **kwargs):
+        precompile(name, source_code, test_code)
+        args = (name, source_code, test_code) + args
+        reader, writer = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(reader)
+            run_limited(writer, self.check, args, kwargs, self.max_memory)
+        os.close(writer)
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.monotonic() + self.timeout
+        try:
+            data = read_until(reader, deadline)
+        finally:
+            os.close(reader)
+        if data is None:
+            os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        if data is None:
+            return Failure('TimeoutError',
+                           f'check timed out after {self.timeout} seconds')
+        if not data:
+            return Failure('WorkerDied', 'check process died')
+        res, imports = pickle.loads(data)
+        for recorder, recorded in zip(recorders(), imports):
+            recorder.imports[:] = recorded
+        return res
+
+
+class CheckTimedOut(BaseException):
+    """not an Exception, so that the tests don't catch it by accident"""
+
+
+class AlarmCheck:
+    """behaves like check but interrupts it after timeout seconds
+    unlike LimitedCheck, it runs in this process, so state is kept
+    (e.g. IncrementalCheck's module)
+    signals only work in the main thread, elsewhere there's no limit"""
+    def __init__(self, check=check, timeout=10):
+        self.check = check
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        if threading.current_thread() is not threading.main_thread():
+            return self.check(*args, **kwargs)
+        timed_out = []
+
+        def interrupt(signum, frame):
+            timed_out.append(True)
+            raise CheckTimedOut()
+
+        old = signal.signal(signal.SIGALRM, interrupt)
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+        try:
+            res = self.check(*args, **kwargs)
+        except CheckTimedOut:
+            res = None
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old)
+        if timed_out:
+            # the tests might have turned it into an ordinary error
+            return Failure('TimeoutError',
+                           f'check timed out after {self.timeout} seconds')
+        return res
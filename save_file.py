@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
+import os
 import sys
-from py import path
-from code import Code
-from fix_code import fixed_code
+import stat
+import time
+import difflib
+import argparse
+import tempfile
+import fix_client
+import tracing
 
 
 def get_source_name(test_file):
@@ -12,15 +17,234 @@ def get_source_name(test_file):
     return filename[len('test_'):]
 
 
-if __name__ == '__main__':
-    assert len(sys.argv) == 2
-    name = sys.argv[1]
+def limits(timeout=10):
+    """keyword arguments for run_code.LimitedCheck
+    GREENER_PYTHON_TIMEOUT is in seconds, 0 means no timeout
+    GREENER_PYTHON_MAX_MEMORY is in MiB, unlimited by default
+    None if there are no limits at all"""
+    timeout = float(os.environ.get('GREENER_PYTHON_TIMEOUT', timeout))
+    memory = os.environ.get('GREENER_PYTHON_MAX_MEMORY')
+    if not timeout and not memory:
+        return None
+    return {'timeout': timeout or None,
+            'max_memory': int(memory) * 2 ** 20 if memory else None}
+
+
+def kept_packages():
+    """packages from GREENER_PYTHON_KEEP (comma separated)
+    they stay loaded between checks even if they're part of the project"""
+    return [el.strip()
+            for el in os.environ.get('GREENER_PYTHON_KEEP', '').split(',')
+            if el.strip()]
+
+
+def cached_check():
+    """check with the limits from the environment
+    caches results and compiled code on disk
+    if GREENER_PYTHON_CACHE names a directory"""
+    import run_code
+    import code_cache
+    from check_cache import CachedCheck
+    from module_snapshot import IsolatedCheck
+    check = IsolatedCheck(keep=kept_packages())
+    kwargs = limits()
+    if kwargs:
+        check = run_code.LimitedCheck(check, **kwargs)
+    directory = os.environ.get('GREENER_PYTHON_CACHE')
+    if directory:
+        check = CachedCheck(check, directory=directory)
+        code_cache.cache.persist(os.path.join(directory, 'code'))
+    return run_code.TargetedCheck(check)
+
+
+def strategy():
+    """how to fix a test and its SUT, GREENER_PYTHON_STRATEGY:
+    single (the default) fixes one issue per check
+    batch fixes the independent issues of all failing tests at once
+    speculative checks several guesses in parallel, see speculation()"""
+    res = os.environ.get('GREENER_PYTHON_STRATEGY', 'single')
+    if res not in ('single', 'batch', 'speculative'):
+        raise ValueError(f'unknown strategy {res}')
+    return res
+
+
+def limited_check_all():
+    """run_code.check_all with the limits from the environment"""
+    import run_code
+    from module_snapshot import IsolatedCheck
+    check_all = IsolatedCheck(run_code.check_all, keep=kept_packages())
+    kwargs = limits()
+    if kwargs:
+        check_all = run_code.LimitedCheck(check_all, **kwargs)
+    return check_all
+
+
+# the worker processes outlive a single fix, e.g. in the server
+speculations = {}
+
+
+def speculation():
+    """for the speculative strategy
+    GREENER_PYTHON_WIDTH guesses per issue (2 by default)
+    for at most GREENER_PYTHON_BUDGET seconds per fix (10 by default)"""
+    from speculative import Speculation
+    width = int(os.environ.get('GREENER_PYTHON_WIDTH', 2))
+    budget = float(os.environ.get('GREENER_PYTHON_BUDGET', 10))
+    if width not in speculations:
+        speculations[width] = Speculation(width)
+    res = speculations[width]
+    res.budget = budget
+    return res
+
+
+def fixed_code_and_issue(code, check=None):
+    """fix_code.fixed_code_and_issue with the strategy()"""
+    import fix_code
+    kind = strategy()
+    if kind == 'batch':
+        return fix_code.batch_fixed_code_and_issue(code, limited_check_all())
+    if kind == 'speculative':
+        return speculation().fixed_code_and_issue(code, check)
+    return fix_code.fixed_code_and_issue(code, check)
+
+
+def write_atomically(file, text):
+    """write to a temporary file first, then rename it
+    readers never see a half written file"""
+    directory = os.path.dirname(str(file))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.greener-')
+    try:
+        # mkstemp only allows the owner to read the file, keep the old mode
+        mode = stat.S_IMODE(os.stat(str(file)).st_mode) \
+            if os.path.exists(str(file)) else 0o644
+        os.chmod(temporary, mode)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(temporary, str(file))
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def write_if_changed(file, text):
+    """only write files that actually change
+    rewriting a file bumps its mtime and makes editors reload it"""
+    if file.check() and file.read_binary() == text.encode():
+        return False
+    write_atomically(file, text)
+    return True
+
+
+def diff(file, old, new, directory=None):
+    """unified diff of a single file, line by line
+    the file name is relative to directory, so patch -p1 can apply it"""
+    name = os.path.relpath(str(file), directory)
+    lines = difflib.unified_diff(old.splitlines(keepends=True),
+                                 new.splitlines(keepends=True),
+                                 f'a/{name}', f'b/{name}')
+    for line in lines:
+        yield line
+        if not line.endswith('\n'):
+            # otherwise patch can't tell where the line ends
+            yield '\n\\ No newline at end of file\n'
+
+
+def read_file(file):
+    return file.read()
+
+
+def fixed_files(file, source_file, check=None, read=read_file):
+    """[(file, old text, new text)] for the test and every SUT it imports
+    and the issue that's left, the files are py.path
+    the other SUTs are the modules next to source_file
+    read gets the text of a file, e.g. from an editor's buffer"""
+    # imported here instead of at the top:
+    # there's no need to pay for them if the server does the work
+    from code import Code
+    import multi_sut
+    name = get_source_name(file)
+    test = read(file)
+    directory = source_file.dirpath()
+    others = [el for el in multi_sut.local_imports(test, str(directory))
+              if el != name]
+    if not others:
+        code = Code(name, test, read(source_file))
+        res, issue = fixed_code_and_issue(code, check)
+        return [(file, code.test, res.test),
+                (source_file, code.source, res.source)], issue
+    files = {name: source_file}
+    files.update((el, directory.join(el + '.py')) for el in others)
+    project = multi_sut.Project(test, {el: read(files[el]) for el in files})
+    res, issue = multi_sut.fixed_project(project, check)
+    return [(file, test, res.test)] + \
+        [(files[el], project.sources[el], res.sources[el]) for el in files], \
+        issue
+
+
+def save_pair(file, source_file, check=None):
+    """fix the test file and the source files in place
+    files that changed in the meantime are left alone: the editor
+    might have saved again, or fix_server.py and save_file.py
+    both fixed the same file after the client gave up waiting"""
+    files, _ = fixed_files(file, source_file, check)
+    for el, old, new in files:
+        if read_file(el) == old:
+            write_if_changed(el, new)
+
+
+def source_file_of(name):
+    from py import path
     file = path.local(name)
-    source_name = get_source_name(file)
     folder = file.dirname
     folder = path.local(folder).join('..')
-    name = get_source_name(file)
-    source_file = folder.join(name + '.py')
-    res = fixed_code(Code(name, file.read(), source_file.read()))
-    file.write(res.test)
-    source_file.write(res.source)
+    return file, folder.join(get_source_name(file) + '.py')
+
+
+def save(name, check=None):
+    file, source_file = source_file_of(name)
+    save_pair(file, source_file, check)
+
+
+def patch(name, check=None, directory=None):
+    """the fix as a unified diff instead of writing it, line by line"""
+    file, source_file = source_file_of(name)
+    files, _ = fixed_files(file, source_file, check)
+    for el, old, new in files:
+        yield from diff(el, old, new, directory)
+
+
+def call_server(method, **params):
+    """the server's response, None if we have to do the work ourselves"""
+    try:
+        return fix_client.call(method, **params)
+    except fix_client.ServerError as e:
+        print(f'server failed, fixing in process: {e}', file=sys.stderr)
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='fix a test file and its source file')
+    parser.add_argument('test_file')
+    parser.add_argument('--diff', action='store_true',
+                        help="print a patch to stdout, don't write anything")
+    args = parser.parse_args()
+    tracing.start_from_environment()
+    # the server might run in a different working directory
+    name = os.path.abspath(args.test_file)
+    start = time.perf_counter()
+    where = 'server'
+    if args.diff:
+        response = call_server('patch', test_file=name,
+                               directory=os.getcwd())
+        if response is None:
+            sys.stdout.writelines(patch(name, cached_check(), os.getcwd()))
+            where = 'in process'
+        else:
+            sys.stdout.write(response['result']['patch'])
+    elif call_server('save', test_file=name) is None:
+        save(name, cached_check())
+        where = 'in process'
+    duration = (time.perf_counter() - start) * 1000
+    verb = 'diffed' if args.diff else 'saved'
+    print(f'{verb} {name} in {duration:.1f} ms ({where})', file=sys.stderr)
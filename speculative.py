@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""don't guess, try
+
+some matchers have to guess: is the called object a class or a function?
+does the method need self? instead of going with the first guess,
+try several candidate fixes at once, each in its own worker process,
+and keep the one that makes the most progress"""
+
+import time
+import run_code
+import fix_code
+import tracing
+from worker_pool import WorkerPool
+
+
+class Speculation:
+    """width: how many candidates per issue
+    budget: seconds per fix, once they're used up only the first
+    guess is checked, like without speculation"""
+    def __init__(self, width=2, budget=10, pool=None):
+        self.width = width
+        self.budget = budget
+        self.own_pool = pool is None
+        self.pool = pool or WorkerPool(width)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.own_pool:
+            self.pool.close()
+
+    def fixed_code(self, broken_code, check=None):
+        return self.fixed_code_and_issue(broken_code, check)[0]
+
+    def fixed_code_and_issue(self, broken_code, check=None):
+        check = check or run_code.TargetedCheck()
+        deadline = time.monotonic() + self.budget
+
+        def check_many(codes):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                over_budget = run_code.Failure(
+                    'TimeoutError', 'speculation ran out of time')
+                first = codes[0]
+                return [check(first.name, first.source, first.test)] \
+                    + [over_budget] * (len(codes) - 1)
+            return self.pool.map([(el.name, el.source, el.test)
+                                  for el in codes], remaining)
+        with tracing.span('fixed_code', sut=broken_code.name,
+                          width=self.width):
+            return fix_code.run_steps(
+                fix_code.fixing_steps(broken_code, self.width), check,
+                check_many)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""generate stubs by reading the test instead of running it
+
+everything the test takes from the SUT (blubb.x, blubb.fun(a, 42),
+blubb.Something()) that the SUT doesn't define yet gets a stub
+running the test afterwards only has to confirm the result"""
+
+import ast
+import textwrap
+from missing_argument import call_arguments
+from missing_argument import fix_literals
+from missing_function import is_class_name
+from utils import start_of_function_declaration
+
+
+def parsed(text):
+    try:
+        return ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+
+
+def imports_module(tree, name):
+    return any(alias.name == name and alias.asname is None
+               for node in ast.walk(tree) if isinstance(node, ast.Import)
+               for alias in node.names)
+
+
+def defined_names(symbols):
+    """names defined at the top level of a module
+    None if we can't know (e.g. because of a wildcard import)"""
+    if symbols is None:
+        return None
+    res = symbols.names()
+    if '*' in res or '__getattr__' in res:
+        return None
+    return res
+
+
+def defines_nothing(code):
+    """an SUT that's only comments can't define what the stubs define
+    otherwise it might, in a way we can't see (think globals()['x'] = 1)"""
+    tree = parsed(code.source)
+    return tree is not None and \
+        all(isinstance(el, ast.Expr) and isinstance(el.value, ast.Constant)
+            for el in tree.body)
+
+
+def simple_call(call):
+    """no *args or **kwargs, so we know what the signature looks like"""
+    return not any(isinstance(el, ast.Starred) for el in call.args) and \
+        all(el.arg is not None for el in call.keywords)
+
+
+def shape(call):
+    return len(call.args), sorted(el.arg for el in call.keywords)
+
+
+class Usage:
+    """how the test uses a name from the SUT"""
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    def stub(self):
+        """None if the calls don't agree on the signature"""
+        if not self.calls:
+            return f'{self.name} = None\n'
+        call = self.calls[0]
+        if not all(simple_call(el) and shape(el) == shape(call)
+                   for el in self.calls):
+            return None
+        args = fix_literals(call_arguments(call))
+        if is_class_name(self.name):
+            return textwrap.dedent(f"""\
+                class {self.name}:
+                    def __init__({', '.join(['self'] + args)}):
+                        pass
+                """)
+        return start_of_function_declaration(self.name) \
+            + ', '.join(args) + '):\n    pass\n'
+
+
+def usages(tree, module_name):
+    """usages of the SUT in the order they appear in the test"""
+    calls = {id(node.func): node for node in ast.walk(tree)
+             if isinstance(node, ast.Call)}
+    nodes = [node for node in ast.walk(tree)
+             if isinstance(node, ast.Attribute)
+             and isinstance(node.ctx, ast.Load)
+             and isinstance(node.value, ast.Name)
+             and node.value.id == module_name]
+    res = {}
+    for node in sorted(nodes, key=lambda el: (el.lineno, el.col_offset)):
+        usage = res.setdefault(node.attr, Usage(node.attr))
+        if id(node) in calls:
+            usage.calls.append(calls[id(node)])
+    return list(res.values())
+
+
+def stubs(code):
+    test = parsed(code.test)
+    if test is None or not imports_module(test, code.name):
+        return []
+    defined = defined_names(code.symbols)
+    if defined is None:
+        return []
+    res = [usage.stub() for usage in usages(test, code.name)
+           if usage.name not in defined]
+    return [el for el in res if el is not None]
+
+
+def stubbed(code):
+    """code with all stubs the test obviously needs
+    returns code itself if there's nothing to add"""
+    res = stubs(code)
+    if not res:
+        return code
+    return code.with_inserted_lines(
+        0, ''.join(el + '\n\n' for el in res).split('\n')[:-1])
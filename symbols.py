@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""symbol table of the SUT, derived from its ast
+
+maps classes, methods, functions and module level names to the lines
+they occupy (counting from 0, end exclusive)
+edits of the source update the table instead of parsing everything
+again, so looking things up doesn't get slower as the source grows"""
+
+import ast
+import textwrap
+from utils import numeric_indentation
+
+
+class Symbol:
+    def __init__(self, kind, name, start, end, indent=0, owner=None):
+        self.kind = kind  # 'class', 'def', 'variable' or 'attribute'
+        self.name = name
+        self.start = start
+        self.end = end
+        self.indent = indent
+        # the class of a method or attribute
+        self.owner = owner
+
+    def moved(self, delta):
+        return Symbol(self.kind, self.name, self.start + delta,
+                      self.end + delta, self.indent, self.owner)
+
+    def resized(self, delta):
+        return Symbol(self.kind, self.name, self.start, self.end + delta,
+                      self.indent, self.owner)
+
+    def key(self):
+        return self.kind, self.owner, self.name
+
+
+def stored_names(node):
+    return [el.id for el in ast.walk(node)
+            if isinstance(el, ast.Name) and isinstance(el.ctx, ast.Store)]
+
+
+def self_attributes(node):
+    """nodes of the self.x = ... assignments in a method"""
+    return [el for el in ast.walk(node)
+            if isinstance(el, ast.Attribute)
+            and isinstance(el.ctx, ast.Store)
+            and isinstance(el.value, ast.Name) and el.value.id == 'self']
+
+
+# statements that contain other statements, e.g. if sys.version_info ...
+compound_statements = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With,
+                       ast.AsyncWith, ast.Try,
+                       getattr(ast, 'TryStar', ast.Try))
+block_fields = ('body', 'orelse', 'finalbody', 'handlers')
+
+
+def blocks(node):
+    """the lists of statements in a compound statement"""
+    return [getattr(node, el, []) for el in ('body', 'orelse', 'finalbody')] \
+        + [el.body for el in getattr(node, 'handlers', [])]
+
+
+def header_names(node):
+    """names a compound statement defines outside of its blocks
+    like the target of a for loop or the as of a with"""
+    res = [name for field, value in ast.iter_fields(node)
+           if field not in block_fields
+           for el in (value if isinstance(value, list) else [value])
+           if isinstance(el, ast.AST)
+           for name in stored_names(el)]
+    return res + [el.name for el in getattr(node, 'handlers', [])
+                  if el.name]
+
+
+def symbols_of(body, offset, indent, owner=None, in_class=False):
+    """symbols defined by a list of statements
+    offset and indent say where the statements are in the source"""
+    res = []
+    for node in body:
+        start = node.lineno - 1 + offset
+        end = node.end_lineno + offset
+        column = node.col_offset + indent
+        if isinstance(node, ast.ClassDef):
+            res.append(Symbol('class', node.name, start, end, column))
+            res += symbols_of(node.body, offset, indent, node.name, True)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            res.append(Symbol('def', node.name, start, end, column, owner))
+            if in_class:
+                res += attributes_of(node, offset, indent, owner)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            res += [Symbol('variable', (el.asname or el.name).split('.')[0],
+                           start, end, column, owner)
+                    for el in node.names]
+        elif isinstance(node, compound_statements):
+            res += [Symbol('variable', name, start, end, column, owner)
+                    for name in header_names(node)]
+            for block in blocks(node):
+                res += symbols_of(block, offset, indent, owner, in_class)
+        else:
+            res += [Symbol('variable', name, start, end, column, owner)
+                    for name in stored_names(node)]
+    return res
+
+
+def attributes_of(method, offset, indent, owner):
+    return [Symbol('attribute', el.attr, el.lineno - 1 + offset,
+                   el.end_lineno + offset, el.col_offset + indent, owner)
+            for el in self_attributes(method)]
+
+
+def parsed(lines):
+    try:
+        return ast.parse('\n'.join(lines))
+    except (SyntaxError, ValueError):
+        return None
+
+
+def parsed_header(lines):
+    """the lines on their own are just the start of a class or function"""
+    tree = parsed(lines + ['    pass'])
+    if tree is None or len(tree.body) != 1 or \
+            not isinstance(tree.body[0], (ast.ClassDef, ast.FunctionDef,
+                                          ast.AsyncFunctionDef)):
+        return None
+    return tree
+
+
+def kind_of(node):
+    return 'class' if isinstance(node, ast.ClassDef) else 'def'
+
+
+def renamed_owner(symbols, old, name, delta):
+    """the members of a renamed class belong to the new name"""
+    return [Symbol(el.kind, el.name, el.start, el.end, el.indent, name)
+            if el.owner == old.name
+            and old.start < el.start < old.end + delta else el
+            for el in symbols]
+
+
+def symbol_table(lines):
+    """None if the source doesn't parse"""
+    tree = parsed(lines)
+    if tree is None:
+        return None
+    return SymbolTable(symbols_of(tree.body, 0, 0))
+
+
+class SymbolTable:
+    def __init__(self, symbols):
+        self.symbols = sorted(symbols, key=lambda el: el.start)
+        self.by_key = {}
+        self.by_name = {}
+        for el in self.symbols:
+            self.by_key.setdefault(el.key(), el)
+            self.by_name.setdefault((el.kind, el.name), el)
+
+    def get(self, kind, name, owner=None):
+        return self.by_key.get((kind, owner, name))
+
+    def first(self, kind, name, owner=None):
+        """like get but any owner will do if we don't know it"""
+        if owner is not None:
+            return self.get(kind, name, owner)
+        return self.by_name.get((kind, name))
+
+    def names(self):
+        """names defined at the top level of the module"""
+        return {el.name for el in self.symbols
+                if el.owner is None and el.kind != 'attribute'}
+
+    def scope(self, line, indent):
+        """innermost class or function that code at line and indent is in"""
+        res = None
+        for el in self.symbols:
+            if el.start > line:
+                break
+            if el.kind in ('class', 'def') and el.start < line < el.end \
+                    and el.indent < indent:
+                res = el
+        return res
+
+    def changed(self, start, end, new_lines):
+        """table after replacing lines[start:end] with new_lines
+        None if we can't tell without parsing the whole source again"""
+        delta = len(new_lines) - (end - start)
+        indents = [numeric_indentation(el) for el in new_lines if el.strip()]
+        indent = min(indents) if indents else None
+        block = textwrap.dedent('\n'.join(new_lines)).split('\n')
+        tree = parsed(block) if indent is not None else None
+        # e.g. a changed signature: the new lines only start a definition
+        header = parsed_header(block) if tree is None else None
+        header_replaced = None
+        res = []
+        for el in self.symbols:
+            if el.end <= start:
+                # code right behind a block might belong to it
+                if el.end == start and indent is not None \
+                        and el.kind in ('class', 'def') and indent > el.indent:
+                    el = el.resized(len(new_lines))
+                res.append(el)
+            elif el.start >= end:
+                res.append(el.moved(delta))
+            elif el.start < start and el.end >= end:
+                if el.kind in ('class', 'def') \
+                        and el.end + delta - el.start < 2:
+                    return None  # nothing left of the body
+                res.append(el.resized(delta))
+            elif el.start == start and el.end > end and header \
+                    and header_replaced is None \
+                    and kind_of(header.body[0]) == el.kind:
+                # the body is still there, only the header changed
+                header_replaced = el
+                res.append(Symbol(el.kind, header.body[0].name, el.start,
+                                  el.end + delta, el.indent, el.owner))
+            elif not (start <= el.start and el.end <= end):
+                # only part of it was replaced, what's left might not parse
+                return None
+            # anything else was replaced and is gone
+        if header_replaced is not None and header_replaced.kind == 'class':
+            res = renamed_owner(res, header_replaced,
+                                header.body[0].name, delta)
+        table = SymbolTable(res)
+        if indent is None:
+            return table
+        if tree is None:
+            return table if header_replaced is not None else None
+        scope = table.scope(start, indent)
+        if scope is None:
+            new = symbols_of(tree.body, start, indent)
+        elif scope.kind == 'class':
+            new = symbols_of(tree.body, start, indent, scope.name, True)
+        elif scope.owner is not None:
+            new = attributes_of(tree, start, indent, scope.owner)
+        else:
+            new = []  # local variables of a function
+        return SymbolTable(res + new)
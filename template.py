@@ -1,13 +1,22 @@
 import textwrap
 
 
-def create(test_name):
+def create(test_name, style='unittest'):
+    """the initial test file, style is unittest or pytest"""
     prefix = "test_"
     file_ending = ".py"
     assert test_name.startswith(prefix)
     assert test_name.endswith(file_ending)
     name = test_name[len(prefix):]
     name = name[:-len(file_ending)]
+    if style == 'pytest':
+        return textwrap.dedent(f"""\
+            import {name}
+
+
+            def test_{name}():
+                pass
+            """)
     return textwrap.dedent(f"""\
         import unittest
         import {name}
@@ -11,9 +11,7 @@ def in_memory_passes(pair):
 
 class AbstractFilePair(Code):
     def __init__(self, name, test='', source=''):
-        self.name = name
-        self.test = test
-        self.source = source
+        super().__init__(name, test, source)
 
 
 def in_test_function(code, name='blubb'):
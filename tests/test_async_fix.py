@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+import async_fix
+import fix_code
+import run_code
+from tests.framework import standard_test_spec
+
+
+def broken():
+    return standard_test_spec('bla = blubb.some_function(1)\n'
+                              'b = blubb.Something()')
+
+
+slow = standard_test_spec('import time\ntime.sleep(0.2)\nbla = blubb.x')
+
+
+class TestFixedCodeAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_same_result(self):
+        res = await async_fix.fixed_code_async(broken())
+        self.assertEqual(res.source, fix_code.fixed_code(broken()).source)
+        self.assertIsNone(fix_code.problem(res))
+
+    async def test_remaining_issue(self):
+        spec = standard_test_spec('a = 3 + "lol"')
+        _, issue = await async_fix.fixed_code_and_issue_async(spec)
+        self.assertEqual(type(issue), fix_code.JustBroken)
+
+    async def test_endless_loop_times_out(self):
+        spec = standard_test_spec('while True: pass')
+        check = run_code.LimitedCheck(timeout=0.2)
+        _, issue = await async_fix.fixed_code_and_issue_async(spec,
+                                                              check=check)
+        self.assertEqual(issue.name, 'timed out')
+
+    async def test_processes(self):
+        with ProcessPoolExecutor(2) as executor:
+            res = await async_fix.fixed_code_async(broken(), executor)
+        self.assertIsNone(fix_code.problem(res))
+
+    async def test_does_not_block(self):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        ticker = asyncio.ensure_future(tick())
+        await async_fix.fixed_code_async(slow)
+        ticker.cancel()
+        self.assertGreater(ticks, 5)
+
+
+class TestFixer(unittest.IsolatedAsyncioTestCase):
+    async def test_newer_version_cancels_older(self):
+        fixer = async_fix.Fixer()
+        old = fixer.fix('test_blubb.py', slow)
+        await asyncio.sleep(0)
+        new = fixer.fix('test_blubb.py', broken())
+        res = await new
+        self.assertTrue(old.cancelled())
+        self.assertIn('some_function', res.source)
+        self.assertEqual(fixer.tasks, {})
+
+    async def test_cancelled_loop_frees_the_thread(self):
+        with ThreadPoolExecutor(1) as executor:
+            fixer = async_fix.Fixer(executor,
+                                    run_code.LimitedCheck(timeout=0.2))
+            fixer.fix('test_blubb.py', standard_test_spec('while True: pass'))
+            await asyncio.sleep(0.05)
+            new = fixer.fix('test_blubb.py', broken())
+            res = await asyncio.wait_for(new, 10)
+        self.assertIn('some_function', res.source)
+
+    async def test_several_files(self):
+        fixer = async_fix.Fixer()
+        first = fixer.fix('test_blubb.py', broken())
+        second = fixer.fix('test_bla.py', slow)
+        await fixer.wait()
+        self.assertIn('some_function', first.result().source)
+        self.assertIn('x = None', second.result().source)
@@ -0,0 +1,138 @@
+from tempfile import TemporaryDirectory
+from py import path
+import textwrap
+import unittest
+import batch
+
+
+fixable = textwrap.dedent("""\
+    import unittest
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            bla = {name}.x
+    """)
+
+passing = textwrap.dedent("""\
+    import unittest
+    import {name}
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            self.assertEqual({name}.x, 1)
+    """)
+
+broken = textwrap.dedent("""\
+    import unittest
+    import {name}
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            bla = {name}.x / 0
+    """)
+
+
+using_helpers = textwrap.dedent("""\
+    import unittest
+    import {name}
+    import helpers
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            bla = helpers.{attribute}
+    """)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.resource = TemporaryDirectory()
+        self.root = path.local(self.resource.name)
+        self.tests = self.root.mkdir('tests')
+
+    def tearDown(self):
+        self.resource.cleanup()
+
+    def add(self, name, test, source=None, directory=''):
+        test_dir = self.tests.join(directory)
+        test_file = test_dir.join(f'test_{name}.py')
+        test_file.write(test.format(name=name), ensure=True)
+        if source is not None:
+            self.root.join(directory, name + '.py').write(source, ensure=True)
+        return test_file
+
+    def test_pairs(self):
+        self.add('a', passing, 'x = 1\n')
+        self.add('b', passing, 'x = 1\n', directory='sub')
+        self.tests.join('helpers.py').write('')
+        self.assertEqual(
+            [(pair.test_file.basename, pair.source_file)
+             for pair in batch.pairs(self.root.strpath)],
+            [('test_a.py', self.root.join('a.py')),
+             ('test_b.py', self.root.join('sub', 'b.py'))])
+
+    def test_skips_libraries(self):
+        self.add('a', passing, 'x = 1\n')
+        venv = self.root.mkdir('venv')
+        venv.join('pyvenv.cfg').write('')
+        library = self.root.join('lib', 'site-packages', 'somelib')
+        for directory in (venv.join('lib', 'somelib'), library):
+            directory.join('tests', 'test_thing.py').write(
+                passing.format(name='thing'), ensure=True)
+        self.assertEqual([pair.test_file.basename
+                          for pair in batch.pairs(self.root.strpath)],
+                         ['test_a.py'])
+
+    def test_missing_source_is_skipped(self):
+        test = self.add('a', fixable)
+        results = batch.fix_all(self.root.strpath, jobs=1)
+        self.assertEqual(results[test.strpath][0], 'skipped')
+        self.assertFalse(self.root.join('a.py').check())
+        self.assertEqual(test.read(), fixable.format(name='a'))
+
+    def test_fix_all(self):
+        fixed = self.add('a', fixable, '')
+        unchanged = self.add('b', passing, 'x = 1\n')
+        still_broken = self.add('c', broken, 'x = 1\n')
+        mtime = unchanged.mtime()
+        results = batch.fix_all(self.root.strpath, jobs=2)
+        self.assertEqual({name: status for name, (status, _)
+                          in results.items()},
+                         {fixed.strpath: 'fixed',
+                          unchanged.strpath: 'unchanged',
+                          still_broken.strpath: 'broken'})
+        self.assertIn('import a', fixed.read())
+        self.assertIn('x = None', self.root.join('a.py').read())
+        self.assertEqual(unchanged.mtime(), mtime)
+        self.assertEqual(self.root.join('c.py').read(), 'x = 1\n')
+
+    def test_shared_module(self):
+        """both tests add to helpers, neither overwrites the other"""
+        for name, attribute in [('a', 'x'), ('b', 'y'), ('c', 'z')]:
+            self.add(name, using_helpers.replace('{attribute}', attribute),
+                     '')
+        self.root.join('helpers.py').write('')
+        self.add('d', passing, 'x = 1\n')
+        self.assertEqual(sorted(len(el) for el in
+                                batch.groups(batch.pairs(self.root.strpath))),
+                         [1, 3])
+        results = batch.fix_all(self.root.strpath, jobs=2)
+        self.assertEqual({status for status, _ in results.values()},
+                         {'fixed', 'unchanged'})
+        helpers = self.root.join('helpers.py').read()
+        for attribute in 'xyz':
+            self.assertIn(f'{attribute} = None', helpers)
+
+    def test_summary(self):
+        results = {'a': ('fixed', 0.1), 'b': ('fixed', 0.1),
+                   'c': ('broken', 0.2), 'd': ('skipped', 0.0)}
+        lines = batch.summary(results, 1.5).splitlines()
+        self.assertEqual(lines[0].split(), ['fixed', '2'])
+        self.assertEqual(lines[1].split(), ['unchanged', '0'])
+        self.assertEqual(lines[2].split(), ['broken', '1'])
+        self.assertEqual(lines[3].split(), ['skipped', '1'])
+        self.assertEqual(lines[4].split(), ['total', '4'])
+        self.assertEqual(lines[5].split(), ['elapsed', '1.5s'])
@@ -0,0 +1,45 @@
+import unittest
+import benchmark
+import fix_code
+
+
+class TestCase(unittest.TestCase):
+    def test_generated_code_is_broken(self):
+        for case in benchmark.cases(sizes=[2]):
+            with self.subTest(case=case.name):
+                self.assertIsNotNone(fix_code.problem(case.code()))
+
+    def test_defects(self):
+        case = benchmark.Case('x', functions=2, attributes=3, arguments=1)
+        self.assertEqual(case.classes, 1)  # attributes need a class
+        self.assertEqual(case.defects(), 7)
+
+    def test_spread_over_tests(self):
+        case = benchmark.Case('x', functions=3, tests=2)
+        test = case.test()
+        self.assertIn('def test_1(self):', test)
+        self.assertNotIn('def test_2(self):', test)
+        self.assertEqual(test.count('blubb.function_'), 3)
+
+    def test_padding(self):
+        case = benchmark.Case('x', functions=1, padding=10)
+        self.assertEqual(case.source().count('def padding_'), 10)
+
+
+class TestRun(unittest.TestCase):
+    def test_run(self):
+        case = benchmark.Case('x', functions=1, attributes=2)
+        res = benchmark.run(case, repeat=1)
+        self.assertTrue(res['fixed'])
+        self.assertEqual(res['name'], 'x')
+        self.assertGreater(res['checks'], 0)
+        self.assertGreaterEqual(res['checks'], res['iterations'])
+        self.assertGreater(res['peak_bytes'], 0)
+        self.assertGreater(res['seconds'], 0)
+        self.assertEqual(res['iterations_per_fix'], res['iterations'] / 4)
+
+    def test_report(self):
+        res = benchmark.run(benchmark.Case('x', functions=1), repeat=1)
+        lines = benchmark.report([res]).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('x '))
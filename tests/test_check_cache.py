@@ -0,0 +1,149 @@
+import os
+import sys
+import unittest
+from tempfile import TemporaryDirectory
+import fix_code
+import run_code
+from check_cache import CachedCheck
+from check_cache import DiskCache
+from module_snapshot import IsolatedCheck
+from tests.framework import standard_test_spec
+
+
+def args(spec):
+    return spec.name, spec.source, spec.test
+
+
+class TestCachedCheck(unittest.TestCase):
+    def setUp(self):
+        self.spec = standard_test_spec('bla = blubb.x')
+
+    def test_same_result(self):
+        check = CachedCheck()
+        self.assertEqual(check(*args(self.spec)),
+                         run_code.check(*args(self.spec)))
+        self.assertEqual(check(*args(self.spec)),
+                         run_code.check(*args(self.spec)))
+        self.assertEqual((check.hits, check.misses), (1, 1))
+
+    def test_normalized_line_endings(self):
+        check = CachedCheck()
+        check(*args(self.spec))
+        check(self.spec.name, self.spec.source,
+              self.spec.test.replace('\n', '\r\n'))
+        self.assertEqual(check.hits, 1)
+
+    def test_whitespace_in_strings(self):
+        check = CachedCheck()
+        test = standard_test_spec("""
+            if blubb.s == 'a\\n':
+                blubb.x
+            """).test
+        self.assertIsNone(check('blubb', 's = """a \n"""[:2]\n', test))
+        self.assertEqual(check('blubb', 's = """a\n"""[:2]\n', test).name,
+                         'x')
+
+    def test_test_id_is_part_of_the_key(self):
+        check = CachedCheck()
+        check(*args(self.spec))
+        check(*args(self.spec), 'TestSomething.test_something')
+        self.assertEqual(check.misses, 2)
+
+    def test_eviction(self):
+        check = CachedCheck(size=2)
+        for source in ('x = 1', 'x = 2', 'x = 3'):
+            check('blubb', source, self.spec.test)
+        check('blubb', 'x = 1', self.spec.test)
+        self.assertEqual((check.hits, check.misses), (0, 4))
+        check('blubb', 'x = 3', self.spec.test)
+        self.assertEqual(check.hits, 1)
+
+    def test_disk(self):
+        with TemporaryDirectory() as directory:
+            CachedCheck(directory=directory)(*args(self.spec))
+            check = CachedCheck(directory=directory)
+            self.assertEqual(check(*args(self.spec)),
+                             run_code.check(*args(self.spec)))
+            self.assertEqual((check.disk_hits, check.misses), (1, 0))
+
+    def test_disk_eviction(self):
+        with TemporaryDirectory() as directory:
+            check = CachedCheck(directory=directory, max_disk_bytes=1000)
+            for i in range(20):
+                check('blubb', f'y = {i}', self.spec.test)
+            self.assertLessEqual(check.disk.bytes, 1000)
+            self.assertLess(len(check.disk.files()), 20)
+
+    def test_overwritten_key_counts_once(self):
+        with TemporaryDirectory() as directory:
+            disk = DiskCache(directory, 1000)
+            for _ in range(3):
+                disk.put('key', 'result')
+            self.assertEqual(disk.bytes, os.path.getsize(disk.file('key')))
+
+    def test_files_evicted_by_another_process(self):
+        with TemporaryDirectory() as directory:
+            disk = DiskCache(directory, 1000)
+            for i in range(5):
+                disk.put(str(i), 'x' * 100)
+            files = disk.files()
+            # another process removes them after they were listed
+            for el in files:
+                os.remove(el)
+            disk.files = lambda: files
+            disk.evict()
+            self.assertEqual(disk.bytes, 0)
+
+    def test_fixing_twice(self):
+        check = CachedCheck()
+        fix_code.fixed_code(self.spec, run_code.TargetedCheck(check))
+        misses = check.misses
+        fix_code.fixed_code(self.spec, run_code.TargetedCheck(check))
+        self.assertEqual(check.misses, misses)
+
+
+class TestProjectModules(unittest.TestCase):
+    """the result also depends on the project modules the test imports"""
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        sys.path.insert(0, self.dir.name)
+        self.helper = os.path.join(self.dir.name, 'greener_helper.py')
+        self.test = 'import greener_helper\n' + \
+            standard_test_spec('greener_helper.use(blubb)').test
+
+    def tearDown(self):
+        sys.path.remove(self.dir.name)
+        self.dir.cleanup()
+
+    def write_helper(self, text, mtime):
+        with open(self.helper, 'w') as file:
+            file.write(text)
+        os.utime(self.helper, (mtime, mtime))
+
+    def changed_helper(self, check):
+        self.write_helper('def use(module):\n    pass\n', 1000)
+        self.assertIsNone(check('blubb', '', self.test))
+        self.write_helper('def use(module):\n    module.x\n', 2000)
+        self.assertEqual(check('blubb', '', self.test).name, 'x')
+        self.assertEqual(check.hits + check.misses, 2)
+
+    def test_changed_helper(self):
+        self.changed_helper(CachedCheck(IsolatedCheck()))
+
+    def test_changed_helper_in_child_process(self):
+        self.changed_helper(CachedCheck(run_code.LimitedCheck(
+            IsolatedCheck())))
+
+    def test_new_helper(self):
+        check = CachedCheck(IsolatedCheck())
+        res = check('blubb', '', self.test)
+        self.assertEqual(res.exc_type, 'ModuleNotFoundError')
+        self.write_helper('def use(module):\n    pass\n', 1000)
+        self.assertIsNone(check('blubb', '', self.test))
+
+    def test_unchanged_helper(self):
+        check = CachedCheck(IsolatedCheck())
+        self.write_helper('def use(module):\n    pass\n', 1000)
+        check('blubb', '', self.test)
+        check('blubb', '', self.test)
+        self.assertEqual((check.hits, check.misses), (1, 1))
@@ -0,0 +1,49 @@
+import textwrap
+import unittest
+from code import Code
+
+
+source = textwrap.dedent("""\
+    class FooBar:
+        def __init__(self):
+            pass
+
+
+    class Foo:
+        def method(self):
+            pass
+
+        def __init__(self):
+            self.x = None
+
+
+    def fun():
+        pass""")
+
+
+class TestCode(unittest.TestCase):
+    def setUp(self):
+        self.code = Code('blubb', '', source)
+
+    def test_source_and_lines_agree(self):
+        code = Code('blubb', '', lines=self.code.source_lines)
+        self.assertEqual(code.source, source)
+
+    def test_edits(self):
+        code = self.code.with_inserted_lines(0, ['x = 1'])
+        code = code.with_changed_lines(1, 2, ['class Bla:'])
+        code = code.with_deleted_lines(2, 20)
+        self.assertEqual(code.source, 'x = 1\nclass Bla:')
+
+    def test_edits_update_symbols(self):
+        self.code.symbols  # build the table before editing
+        code = self.code.with_inserted_lines(0, ['def new():', '    pass'])
+        self.assertIsNotNone(code._symbols)
+        self.assertEqual(code.symbols.get('def', 'new').start, 0)
+        self.assertEqual(code.symbols.get('def', '__init__', 'Foo').start, 11)
+
+    def test_changing_test_keeps_source(self):
+        lines = self.code.source_lines
+        code = self.code.with_changed_test('bla')
+        self.assertEqual(code.test, 'bla')
+        self.assertIs(code.source_lines, lines)
@@ -0,0 +1,72 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+import code_cache
+import run_code
+
+
+class TestCodeCache(unittest.TestCase):
+    def test_compiles_once(self):
+        cache = code_cache.CodeCache()
+        first = cache.compile('x = 1', '<SUT>')
+        self.assertIs(cache.compile('x = 1', '<SUT>'), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_file_name_matters(self):
+        cache = code_cache.CodeCache()
+        res = cache.compile('x = 1', '<test>')
+        self.assertIsNot(cache.compile('x = 1', '<SUT>'), res)
+        self.assertEqual(res.co_filename, '<test>')
+
+    def test_size(self):
+        cache = code_cache.CodeCache(size=2)
+        for i in range(3):
+            cache.compile(f'x = {i}', '<SUT>')
+        self.assertEqual(len(cache.entries), 2)
+        cache.compile('x = 0', '<SUT>')
+        self.assertEqual(cache.misses, 4)
+
+    def test_syntax_error(self):
+        cache = code_cache.CodeCache()
+        with self.assertRaises(SyntaxError):
+            cache.compile('x = ', '<SUT>')
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_disk(self):
+        with TemporaryDirectory() as directory:
+            cache = code_cache.CodeCache()
+            cache.persist(directory)
+            cache.compile('x = 1', '<SUT>')
+            other = code_cache.CodeCache()
+            other.persist(directory)
+            res = other.compile('x = 1', '<SUT>')
+            self.assertEqual(other.disk_hits, 1)
+            namespace = {}
+            exec(res, namespace)
+            self.assertEqual(namespace['x'], 1)
+
+    def test_broken_file_on_disk(self):
+        with TemporaryDirectory() as directory:
+            cache = code_cache.CodeCache()
+            cache.persist(directory)
+            cache.compile('x = 1', '<SUT>')
+            for file in os.listdir(directory):
+                with open(os.path.join(directory, file), 'wb') as f:
+                    f.write(b'garbage')
+            other = code_cache.CodeCache()
+            other.persist(directory)
+            other.compile('x = 1', '<SUT>')
+            self.assertEqual(other.misses, 1)
+
+
+class TestRunCode(unittest.TestCase):
+    def test_check_uses_cache(self):
+        test = 'import blubb\nimport unittest\n' \
+            'class T(unittest.TestCase):\n' \
+            '    def test_a(self):\n' \
+            '        blubb.x\n'
+        source = 'x = 1  # test_check_uses_cache\n'
+        run_code.check('blubb', source, test)
+        hits = code_cache.cache.hits
+        run_code.check('blubb', source, test)
+        self.assertEqual(code_cache.cache.hits, hits + 2)
@@ -1,4 +1,8 @@
 import textwrap
+import unittest
+import fix_code
+import run_code
+from code import Code
 from tests.framework import AbstractFilePair
 from tests.framework import in_test_function
 from tests.framework import standard_test_spec
@@ -85,6 +89,13 @@ class TestSavingFixesSUT(SavingFixesSUT):
             a = blubb.Something()
             b = a.attribute
             """),
+        # create object of missing class with two attributes
+        standard_test_spec(
+            """
+            a = blubb.Something()
+            b = a.attribute
+            c = a.other_attribute
+            """),
         # create object of missing class with nullary method
         standard_test_spec(
             """
@@ -149,3 +160,87 @@ class TestSavingDoesNotTouchBrokenStuff(SavingDoesNotTouchBrokenStuff):
                 pass
             """)
             ]
+
+
+def several_tests(*lines):
+    res = textwrap.dedent("""\
+        import blubb
+        import unittest
+
+
+        class TestSomething(unittest.TestCase):
+        """)
+    for i, line in enumerate(lines):
+        res += f'    def test_{i}(self):\n        {line}\n\n'
+    return res
+
+
+class CountingCheckAll:
+    def __init__(self):
+        self.runs = 0
+        self.tests = []
+
+    def __call__(self, name, source_code, test_code):
+        self.runs += 1
+        self.tests.append(test_code)
+        return run_code.check_all(name, source_code, test_code)
+
+
+class TestBatchFixedCode(unittest.TestCase):
+    def test_fixes_independent_issues_together(self):
+        test = several_tests('bla = blubb.x', 'bla = blubb.y',
+                             'bla = collections.OrderedDict()')
+        check_all = CountingCheckAll()
+        # no static stubs for an SUT with a wildcard import
+        res = fix_code.batch_fixed_code(
+            Code('blubb', test, 'from os import *\n'), check_all)
+        self.assertIsNone(fix_code.problem(res))
+        self.assertIn('import collections', res.test)
+        self.assertIn('x = None', res.source)
+        self.assertIn('y = None', res.source)
+        # one run to find the three issues, one to confirm the fix
+        self.assertEqual(check_all.runs, 2)
+
+    def test_falls_back_to_single_fixes(self):
+        code = Code('blubb', several_tests('bla = collections.OrderedDict()',
+                                           'bla = lalelu.x'), '')
+        check_all = CountingCheckAll()
+        res, issue = fix_code.batch_fixed_code_and_issue(code, check_all)
+        self.assertIn('import collections', res.test)
+        self.assertNotIn('import lalelu', res.test)
+        self.assertEqual(issue.name, 'lalelu')
+        # lalelu can't be imported, so the batch with both imports
+        # is worse and only the first issue is fixed
+        batched, single = check_all.tests[1:3]
+        self.assertIn('import lalelu', batched)
+        first = fix_code.problems(code)[0]
+        self.assertEqual(single, first.fix(code).test)
+
+    def test_same_result_as_fixed_code(self):
+        for spec in TestSavingFixesSUT.tests:
+            self.assertEqual(fix_code.batch_fixed_code(spec).source,
+                             fix_code.fixed_code(spec).source)
+
+    def test_limited_check_all(self):
+        spec = standard_test_spec('while True: pass')
+        check_all = run_code.LimitedCheck(run_code.check_all, timeout=0.2)
+        _, issue = fix_code.batch_fixed_code_and_issue(spec, check_all)
+        self.assertEqual(issue.name, 'timed out')
+
+    def test_broken_stuff_is_not_touched(self):
+        for spec in TestSavingDoesNotTouchBrokenStuff.tests:
+            res = fix_code.batch_fixed_code(spec)
+            self.assertEqual(res.source, spec.source)
+            self.assertEqual(res.test, spec.test)
+
+
+class TestPlainTests(unittest.TestCase):
+    def test_fixes_pytest_style_test(self):
+        test = textwrap.dedent("""\
+            def test_something():
+                assert blubb.double(blubb.x) == 2
+            """)
+        res = fix_code.fixed_code(Code('blubb', test, ''))
+        self.assertIsNone(fix_code.problem(res))
+        self.assertIn('import blubb', res.test)
+        self.assertIn('def double(', res.source)
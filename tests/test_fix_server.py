@@ -0,0 +1,164 @@
+import io
+import os
+import json
+import contextlib
+import socket
+import tempfile
+import threading
+import unittest
+from tempfile import TemporaryDirectory
+import fix_client
+import fix_server
+import run_code
+import save_file
+from tests.framework import standard_test_spec
+
+
+class TestSocketPath(unittest.TestCase):
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        self.old = {el: os.environ.pop(el, None)
+                    for el in ('XDG_RUNTIME_DIR', 'GREENER_PYTHON_SOCKET')}
+        self.tempdir = tempfile.tempdir
+        tempfile.tempdir = self.dir.name
+
+    def tearDown(self):
+        tempfile.tempdir = self.tempdir
+        for key, value in self.old.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self.dir.cleanup()
+
+    def test_private_directory(self):
+        directory = os.path.dirname(fix_client.socket_path())
+        self.assertEqual(os.path.dirname(directory), self.dir.name)
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+    def test_runtime_directory(self):
+        os.environ['XDG_RUNTIME_DIR'] = self.dir.name
+        os.chmod(self.dir.name, 0o700)
+        self.assertEqual(os.path.dirname(fix_client.socket_path()),
+                         self.dir.name)
+
+    def test_directory_others_can_write_to(self):
+        directory = os.path.join(self.dir.name,
+                                 f'greener-python-{os.getuid()}')
+        os.mkdir(directory)
+        os.chmod(directory, 0o777)
+        with self.assertRaises(fix_client.ServerError):
+            fix_client.socket_path()
+        # no server to talk to, so save_file fixes the code itself
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertIsNone(save_file.call_server('stats'))
+
+
+class TestFixServer(unittest.TestCase):
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        self.address = os.path.join(self.dir.name, 'server.sock')
+        self.server = fix_server.Server(self.address)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.dir.cleanup()
+
+    def test_fix(self):
+        spec = standard_test_spec('bla = blubb.x')
+        response = fix_client.call('fix', self.address, name=spec.name,
+                                   test=spec.test, source=spec.source)
+        self.assertEqual(response['result']['test'], spec.test)
+        self.assertIn('x = None', response['result']['source'])
+        self.assertGreaterEqual(response['latency'], 0)
+
+    def test_server_check_sees_the_new_base(self):
+        check = fix_server.server_check()
+        test = standard_test_spec('blubb.B().f()').test
+        subclass = 'class B(A):\n    pass\n'
+        check('blubb', 'class A:\n    pass\n\n\n' + subclass, test)
+        source = 'class A:\n    def f(self):\n        pass\n\n\n' + subclass
+        self.assertIsNone(check('blubb', source, test))
+
+    def test_unknown_method(self):
+        with self.assertRaises(fix_client.ServerError):
+            fix_client.call('lalelu', self.address)
+
+    def test_default_timeout(self):
+        self.assertIsInstance(fix_server.server_check(), run_code.AlarmCheck)
+
+    def test_server_does_not_answer(self):
+        address = os.path.join(self.dir.name, 'silent.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as silent:
+            silent.bind(address)
+            silent.listen()
+            self.assertIsNone(fix_client.call('fix', address, timeout=0.1))
+
+    def test_malformed_request(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(self.address)
+            with connection.makefile('rwb') as stream:
+                for line in [b'{"method": \n', b'[1, 2]\n']:
+                    stream.write(line)
+                    stream.flush()
+                    response = json.loads(stream.readline())
+                    self.assertIn(response['error']['code'], (-32700, -32600))
+                # the connection is still usable
+                stream.write(b'{"id": 3, "method": "stats"}\n')
+                stream.flush()
+                self.assertEqual(json.loads(stream.readline())['id'], 3)
+
+    def test_server_error_means_fixing_in_process(self):
+        old = os.environ.get('GREENER_PYTHON_SOCKET')
+        os.environ['GREENER_PYTHON_SOCKET'] = self.address
+        try:
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertIsNone(save_file.call_server('lalelu'))
+            self.assertIsNotNone(save_file.call_server('stats'))
+        finally:
+            if old is None:
+                del os.environ['GREENER_PYTHON_SOCKET']
+            else:
+                os.environ['GREENER_PYTHON_SOCKET'] = old
+
+    def test_garbage_response(self):
+        address = os.path.join(self.dir.name, 'garbage.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(address)
+            server.listen()
+
+            def answer():
+                connection, _ = server.accept()
+                with connection, connection.makefile('rwb') as stream:
+                    stream.readline()
+                    stream.write(b'garbage\n')
+            thread = threading.Thread(target=answer)
+            thread.start()
+            with self.assertRaises(fix_client.ServerError):
+                fix_client.call('fix', address)
+            thread.join()
+
+    def test_foreign_socket(self):
+        if os.getuid() != 0:
+            self.skipTest('only root can give the socket away')
+        os.chown(self.address, os.getuid() + 1, -1)
+        with self.assertRaises(fix_client.ServerError):
+            fix_client.call('stats', self.address)
+
+    def test_no_server(self):
+        address = os.path.join(self.dir.name, 'nobody_listens.sock')
+        self.assertIsNone(fix_client.call('fix', address))
+
+    def test_patch(self):
+        test_file = os.path.join(self.dir.name, 'tests', 'test_blubb.py')
+        os.mkdir(os.path.dirname(test_file))
+        with open(test_file, 'w') as f:
+            f.write(standard_test_spec('bla = blubb.x').test)
+        with open(os.path.join(self.dir.name, 'blubb.py'), 'w') as f:
+            f.write('')
+        response = fix_client.call('patch', self.address, test_file=test_file)
+        self.assertIn('+x = None\n', response['result']['patch'])
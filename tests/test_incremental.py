@@ -0,0 +1,101 @@
+import textwrap
+import unittest
+import fix_code
+import run_code
+from incremental import IncrementalCheck
+from tests.framework import standard_test_spec
+
+
+expensive_source = textwrap.dedent("""\
+    import collections
+    counter = collections.Counter()
+    counter['loads'] += 1
+
+
+    def fun():
+        return counter['loads']
+    """)
+
+
+class TestIncrementalCheck(unittest.TestCase):
+    def setUp(self):
+        self.check = IncrementalCheck()
+
+    def test_only_changes_are_executed(self):
+        test = standard_test_spec('self.assertEqual(blubb.fun(), 1)').test
+        self.assertIsNone(self.check('blubb', expensive_source, test))
+        source = 'x = None\n\n\n' + expensive_source
+        # counter['loads'] would be 1 after a full load, too
+        # but the statement isn't executed again
+        self.assertIsNone(self.check('blubb', source, test))
+        self.assertEqual((self.check.full_loads, self.check.partial_loads),
+                         (1, 1))
+
+    def test_changed_function(self):
+        test = standard_test_spec('self.assertEqual(blubb.fun(), 2)').test
+        self.check('blubb', 'def fun():\n    return 1\n', test)
+        self.assertIsNone(self.check('blubb',
+                                     'def fun():\n    return 2\n', test))
+        self.assertEqual(self.check.partial_loads, 1)
+
+    def test_removed_names_are_gone(self):
+        test = standard_test_spec('blubb.x').test
+        self.check('blubb', 'x = None\n', test)
+        self.assertEqual(self.check('blubb', 'y = None\n', test).name, 'x')
+
+    def test_side_effects_mean_full_load(self):
+        test = standard_test_spec('pass').test
+        self.check('blubb', 'x = []\n', test)
+        self.check('blubb', 'x = []\nx.append(1)\n', test)
+        self.assertEqual(self.check.full_loads, 2)
+
+    def test_changes_by_the_test_mean_full_load(self):
+        test = standard_test_spec('blubb.x = 42').test
+        self.check('blubb', 'x = None\n', test)
+        self.check('blubb', 'x = None\n', test)
+        self.assertEqual(self.check.full_loads, 2)
+
+    def test_changes_in_place_mean_full_load(self):
+        test = standard_test_spec("""
+            blubb.items.append(1)
+            if len(blubb.items) > 1:
+                blubb.stale_state_leaked
+            """).test
+        self.assertIsNone(self.check('blubb', 'items = []\n', test))
+        self.assertIsNone(self.check('blubb', 'items = []\n', test))
+        self.assertIsNone(self.check('blubb', 'items = []\ny = 1\n', test))
+        self.assertEqual(self.check.full_loads, 3)
+
+    def test_changed_class_means_full_load(self):
+        test = standard_test_spec("""
+            if hasattr(blubb.Config, 'x'):
+                blubb.stale_state_leaked
+            blubb.Config.x = 1
+            """).test
+        source = 'class Config:\n    pass\n'
+        self.assertIsNone(self.check('blubb', source, test))
+        self.assertIsNone(self.check('blubb', source, test))
+
+    def test_kept_statements_see_the_new_value(self):
+        test = standard_test_spec('self.assertEqual(blubb.Y, 2)').test
+        self.check('blubb', 'X = 1\nY = X\n', test)
+        self.assertIsNone(self.check('blubb', 'X = 2\nY = X\n', test))
+        self.assertEqual(self.check.full_loads, 2)
+
+    def test_kept_subclass_sees_the_new_base(self):
+        test = standard_test_spec('blubb.B().f()').test
+        subclass = 'class B(A):\n    pass\n'
+        self.check('blubb', 'class A:\n    pass\n\n\n' + subclass, test)
+        source = 'class A:\n    def f(self):\n        pass\n\n\n' + subclass
+        self.assertIsNone(self.check('blubb', source, test))
+
+    def test_fixed_code(self):
+        spec = standard_test_spec(
+            """
+            a = blubb.Something()
+            b = a.fun()
+            c = a.attribute
+            """)
+        res = fix_code.fixed_code(spec, self.check)
+        self.assertIsNone(run_code.check(res.name, res.source, res.test))
+        self.assertGreater(self.check.partial_loads, 0)
@@ -0,0 +1,242 @@
+import io
+import unittest
+from tempfile import TemporaryDirectory
+from py import path
+import lsp_server
+import run_code
+from tests.framework import standard_test_spec
+
+
+def apply_edits(text, edits):
+    # the ranges refer to the old text -> apply them back to front
+    for edit in reversed(edits):
+        text = lsp_server.apply_change(
+            text, {'range': edit['range'], 'text': edit['newText']})
+    return text
+
+
+def messages(output):
+    stream = io.BytesIO(output.getvalue())
+    res = []
+    while True:
+        message = lsp_server.read_message(stream)
+        if message is None:
+            return res
+        res.append(message)
+
+
+class TestFraming(unittest.TestCase):
+    def test_round_trip(self):
+        stream = io.BytesIO()
+        lsp_server.write_message(stream, {'id': 1, 'text': 'ä'})
+        lsp_server.write_message(stream, {'id': 2})
+        stream.seek(0)
+        self.assertEqual(lsp_server.read_message(stream),
+                         {'id': 1, 'text': 'ä'})
+        self.assertEqual(lsp_server.read_message(stream), {'id': 2})
+        self.assertIsNone(lsp_server.read_message(stream))
+
+
+class TestIncrementalSync(unittest.TestCase):
+    def change(self, text, start, end, new):
+        return lsp_server.apply_change(text, {
+            'range': {'start': {'line': start[0], 'character': start[1]},
+                      'end': {'line': end[0], 'character': end[1]}},
+            'text': new})
+
+    def test_replace(self):
+        self.assertEqual(self.change('abc\ndef\n', (1, 1), (1, 2), 'X'),
+                         'abc\ndXf\n')
+
+    def test_across_lines(self):
+        self.assertEqual(self.change('abc\ndef\n', (0, 2), (1, 1), ''),
+                         'abef\n')
+
+    def test_append(self):
+        self.assertEqual(self.change('abc', (0, 3), (0, 3), '\nd'),
+                         'abc\nd')
+        self.assertEqual(self.change('abc\n', (1, 0), (1, 0), 'd'),
+                         'abc\nd')
+
+    def test_utf16(self):
+        # the emoji is two UTF-16 code units
+        self.assertEqual(self.change('a😀b\n', (0, 3), (0, 4), 'c'),
+                         'a😀c\n')
+
+    def test_form_feed_is_not_a_line_break(self):
+        text = 'a = 1\n\x0c\nb = 2\n'
+        self.assertEqual(self.change(text, (2, 0), (2, 1), 'c'),
+                         'a = 1\n\x0c\nc = 2\n')
+
+    def test_line_endings(self):
+        self.assertEqual(self.change('a\r\nb\rc\n', (2, 0), (2, 1), 'X'),
+                         'a\r\nb\rX\n')
+
+    def test_full_text(self):
+        self.assertEqual(lsp_server.apply_change('abc', {'text': 'x'}), 'x')
+
+
+class TestTextEdits(unittest.TestCase):
+    def test_only_changed_lines(self):
+        old = 'a\nb\nc\n'
+        edits = lsp_server.text_edits(old, 'a\nB\nc\n')
+        self.assertEqual(edits, [{
+            'range': {'start': {'line': 1, 'character': 0},
+                      'end': {'line': 2, 'character': 0}},
+            'newText': 'B\n'}])
+
+    def test_form_feed(self):
+        edits = lsp_server.text_edits('a = 1\n\x0c\nb = 2\n',
+                                      'a = 1\n\x0c\nx = 0\nb = 2\n')
+        self.assertEqual(edits[0]['range']['start'],
+                         {'line': 2, 'character': 0})
+
+    def test_no_changes(self):
+        self.assertEqual(lsp_server.text_edits('a\n', 'a\n'), [])
+
+    def test_round_trip(self):
+        cases = [('', 'x = None\n'), ('a', 'a\nb'), ('a\nb', 'a\nc'),
+                 ('a = 1\n\x0c\nb = 2\n', 'a = 1\n\x0c\nx = 0\nb = 2\n'),
+                 ('a\r', 'a\rb'), ('a\u2028b\n', 'a\u2028c\n'),
+                 ('a\nb\n', 'b\n'), ('import x\n', 'import y\nimport x\n')]
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                edits = lsp_server.text_edits(old, new)
+                self.assertEqual(apply_edits(old, edits), new)
+
+
+class TestLanguageServer(unittest.TestCase):
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        root = path.local(self.dir.name)
+        self.test_file = root.mkdir('tests').join('test_blubb.py')
+        self.test_file.write('')
+        self.source_file = root.join('blubb.py')
+        self.output = io.BytesIO()
+        self.server = lsp_server.LanguageServer(self.output, run_code.check)
+        self.uri = lsp_server.path_to_uri(self.test_file)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def send(self, method, id=None, **params):
+        message = {'jsonrpc': '2.0', 'method': method, 'params': params}
+        if id is not None:
+            message['id'] = id
+        self.server.handle(message)
+
+    def open(self, text):
+        self.send('textDocument/didOpen', textDocument={
+            'uri': self.uri, 'languageId': 'python', 'version': 1,
+            'text': text})
+
+    def edits(self, edit):
+        return {el['textDocument']['uri']: el['edits']
+                for el in edit['documentChanges'] if 'edits' in el}
+
+    def test_initialize(self):
+        self.send('initialize', id=1, capabilities={})
+        response, = messages(self.output)
+        self.assertEqual(response['id'], 1)
+        capabilities = response['result']['capabilities']
+        self.assertEqual(capabilities['textDocumentSync']['change'], 2)
+
+    def test_code_action_uses_the_buffer(self):
+        spec = standard_test_spec('bla = blubb.x')
+        # nothing on disk, the fix only sees the editor's buffer
+        self.open('')
+        self.send('textDocument/didChange',
+                  textDocument={'uri': self.uri, 'version': 2},
+                  contentChanges=[{'text': spec.test}])
+        self.send('textDocument/codeAction', id=2, textDocument={
+            'uri': self.uri}, range={}, context={'diagnostics': []})
+        response, = messages(self.output)
+        action, = response['result']
+        edits = self.edits(action['edit'])
+        # the test is fine, the SUT doesn't exist yet
+        self.assertEqual(list(edits),
+                         [lsp_server.path_to_uri(self.source_file)])
+        created = action['edit']['documentChanges'][0]
+        self.assertEqual(created['kind'], 'create')
+        source = apply_edits('', edits[created['uri']])
+        self.assertIn('x = None', source)
+        self.assertEqual(self.test_file.read(), '')
+
+    def test_save_applies_edit(self):
+        self.source_file.write('x = None\n')
+        broken = standard_test_spec('bla = blubb.x').test.replace(
+            'import blubb\n', '')
+        self.open(broken)
+        self.send('textDocument/didSave', textDocument={'uri': self.uri})
+        request, = messages(self.output)
+        self.assertEqual(request['method'], 'workspace/applyEdit')
+        edits = self.edits(request['params']['edit'])
+        self.assertEqual(list(edits), [self.uri])
+        self.assertIn('import blubb', apply_edits(broken, edits[self.uri]))
+        version = request['params']['edit']['documentChanges'][0]
+        self.assertEqual(version['textDocument']['version'], 1)
+
+    def test_nothing_to_fix(self):
+        self.source_file.write('x = None\n')
+        self.open(standard_test_spec('bla = blubb.x').test)
+        self.send('textDocument/codeAction', id=3,
+                  textDocument={'uri': self.uri})
+        response, = messages(self.output)
+        self.assertEqual(response['result'], [])
+
+    def test_change_drops_running_fix(self):
+        spec = standard_test_spec('bla = blubb.x')
+        self.open(spec.test)
+        # arrives while the fix is running
+        self.server.messages.put({
+            'jsonrpc': '2.0', 'method': 'textDocument/didChange',
+            'params': {'textDocument': {'uri': self.uri, 'version': 2},
+                       'contentChanges': [{'text': spec.test + '\n'}]}})
+        self.send('textDocument/codeAction', id=7,
+                  textDocument={'uri': self.uri})
+        response, = messages(self.output)
+        self.assertEqual(response['error']['code'], -32801)
+        self.assertEqual(self.server.documents[self.uri], spec.test + '\n')
+
+    def test_requests_wait_for_the_fix(self):
+        self.open(standard_test_spec('bla = blubb.x').test)
+        self.server.messages.put({'jsonrpc': '2.0', 'id': 8,
+                                  'method': 'shutdown'})
+        self.send('textDocument/codeAction', id=7,
+                  textDocument={'uri': self.uri})
+        response, = messages(self.output)
+        self.assertEqual(response['id'], 7)
+        self.assertEqual(self.server.next_message()['id'], 8)
+
+    def test_run(self):
+        input = io.BytesIO()
+        lsp_server.write_message(input, {
+            'jsonrpc': '2.0', 'method': 'textDocument/didOpen',
+            'params': {'textDocument': {
+                'uri': self.uri, 'version': 1,
+                'text': standard_test_spec('bla = blubb.x').test}}})
+        lsp_server.write_message(input, {
+            'jsonrpc': '2.0', 'id': 1, 'method': 'textDocument/codeAction',
+            'params': {'textDocument': {'uri': self.uri}}})
+        lsp_server.write_message(input, {'jsonrpc': '2.0', 'method': 'exit'})
+        input.seek(0)
+        self.server.run(input)
+        response, = messages(self.output)
+        action, = response['result']
+        self.assertEqual(action['kind'], 'quickfix')
+
+    def test_not_a_test(self):
+        self.send('textDocument/codeAction', id=4, textDocument={
+            'uri': lsp_server.path_to_uri(self.source_file)})
+        response, = messages(self.output)
+        self.assertEqual(response['result'], [])
+
+    def test_unknown_method(self):
+        self.send('lalelu', id=5)
+        response, = messages(self.output)
+        self.assertEqual(response['error']['code'], -32601)
+
+    def test_exit(self):
+        self.send('shutdown', id=6)
+        self.send('exit')
+        self.assertFalse(self.server.running)
@@ -0,0 +1,69 @@
+import unittest
+import fix_code
+import matchers
+from run_code import Failure
+from tests.framework import standard_test_spec
+
+
+def match_anything(failure, code):
+    return failure.message
+
+
+def match_nothing(failure, code):
+    return None
+
+
+class DivisionByZero:
+    name = 'division'
+
+    def fix(self, code):
+        return code.with_changed_source('x = 1\n')
+
+
+def match_division(failure, code):
+    return DivisionByZero()
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = matchers.Registry()
+
+    def test_dispatch_on_exception_type(self):
+        self.registry.add('TypeError', match_anything)
+        self.assertEqual(self.registry.match(Failure('TypeError', 'bla'),
+                                             None),
+                         'bla')
+        self.assertIsNone(self.registry.match(Failure('NameError', 'bla'),
+                                              None))
+
+    def test_pattern(self):
+        self.registry.add('TypeError', match_anything, 'not callable')
+        failure = Failure('TypeError', "'int' object is not callable")
+        self.assertEqual(self.registry.candidates(failure), [match_anything])
+        self.assertEqual(self.registry.candidates(Failure('TypeError', 'x')),
+                         [])
+
+    def test_first_match_wins(self):
+        self.registry.add('TypeError', match_nothing)
+        self.registry.add('TypeError', match_anything)
+        self.assertEqual(self.registry.match(Failure('TypeError', 'bla'),
+                                             None),
+                         'bla')
+
+    def test_timings(self):
+        self.registry.add('TypeError', match_nothing)
+        self.registry.match(Failure('TypeError', 'bla'), None)
+        timing = self.registry.timings[matchers.matcher_name(match_nothing)]
+        self.assertEqual(timing.calls, 1)
+        self.assertIn('match_nothing: 1 calls', self.registry.report())
+
+
+class TestPlugin(unittest.TestCase):
+    def tearDown(self):
+        matchers.registry.remove('ZeroDivisionError', match_division)
+
+    def test_fix_code_uses_registered_matchers(self):
+        spec = standard_test_spec('a = blubb.x / 0', 'x = 1\n')
+        self.assertIsInstance(fix_code.problem(spec), fix_code.JustBroken)
+        matchers.register('ZeroDivisionError')(match_division)
+        self.assertIsInstance(fix_code.problem(spec), DivisionByZero)
@@ -1,11 +1,21 @@
 import unittest
-from missing_argument import get_arguments
+import run_code
+from missing_argument import call_arguments
+from missing_argument import relevant_call
+from missing_argument import match_missing_argument
 from tests.framework import standard_test_spec
 from tests.framework import SavingFixesSUT
 from tests.framework import fixing_test
 
 
-class TestGetArguments(unittest.TestCase):
+def get_arguments(function_name, line):
+    """the arguments of the call that fails in line"""
+    failure = run_code.Failure('TypeError', '', lineno=1)
+    return call_arguments(relevant_call(line.strip(), failure,
+                                        function_name))
+
+
+class TestCallArguments(unittest.TestCase):
     def test_no_arguments(self):
         self.assertEqual(get_arguments("fun", "\tfun()"),
                          [])
@@ -40,6 +50,44 @@ class TestGetArguments(unittest.TestCase):
         self.assertEqual(get_arguments("fun", "\tbla(fun(), 0)"),
                          [])
 
+    def test_constructor(self):
+        self.assertEqual(get_arguments("__init__", "\ta = Blubb(x, 2)"),
+                         ["x", "1"])
+
+
+def matched_arguments(spec):
+    failure = run_code.check(spec.name, spec.source, spec.test)
+    return match_missing_argument(failure, spec).args
+
+
+class TestMatchMissingArgument(unittest.TestCase):
+    def test_multi_line_call(self):
+        spec = standard_test_spec(
+            """
+            x = 1
+            bla = blubb.some_function(
+                x,
+                [1, 2],
+                a=(3, 4))
+            """,
+            """
+            def some_function():
+                pass
+            """)
+        self.assertEqual(matched_arguments(spec), ['x', 'arg0', 'a=1'])
+
+    def test_same_function_twice_in_a_line(self):
+        spec = standard_test_spec(
+            """
+            x = 1
+            bla = blubb.some_function(1) + blubb.some_function(x, 2)
+            """,
+            """
+            def some_function(a):
+                pass
+            """)
+        self.assertEqual(matched_arguments(spec), ['x', 'arg0'])
+
 
 @fixing_test
 class TestSavingFixesMissingArguments(SavingFixesSUT):
@@ -63,4 +111,23 @@ class TestSavingFixesMissingArguments(SavingFixesSUT):
                     pass
                 def some_method(x = 13):
                     pass
+            """),
+        standard_test_spec(  # function defined in an if
+            """
+            bla = blubb.some_function(1)
+            """,
+            """
+            if True:
+                def some_function():
+                    pass
+            """),
+        standard_test_spec(  # call spanning several lines
+            """
+            bla = blubb.some_function(
+                1,
+                2)
+            """,
+            """
+            def some_function():
+                pass
             """)]
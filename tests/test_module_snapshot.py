@@ -0,0 +1,93 @@
+import sys
+import textwrap
+import unittest
+from tempfile import TemporaryDirectory
+from py import path
+import module_snapshot
+
+
+def importing_test(*modules):
+    imports = '\n'.join(f'import {el}' for el in modules)
+    return imports + textwrap.dedent("""
+        import unittest
+
+
+        class TestSomething(unittest.TestCase):
+            def test_something(self):
+                pass
+        """)
+
+
+class TestIsolatedCheck(unittest.TestCase):
+    def setUp(self):
+        self.resource = TemporaryDirectory()
+        self.dir = path.local(self.resource.name)
+        sys.path.insert(0, self.dir.strpath)
+
+    def tearDown(self):
+        sys.path.remove(self.dir.strpath)
+        for name in ['greener_helper', 'greener_package',
+                     'greener_package.sub']:
+            sys.modules.pop(name, None)
+        self.resource.cleanup()
+
+    def test_evicts_project_modules(self):
+        self.dir.join('greener_helper.py').write('x = 1')
+        check = module_snapshot.IsolatedCheck()
+        self.assertIsNone(check('blubb', '', importing_test('greener_helper')))
+        self.assertNotIn('greener_helper', sys.modules)
+
+    def test_sees_changes(self):
+        helper = self.dir.join('greener_helper.py')
+        helper.write('x = 1')
+        test = importing_test('greener_helper') \
+            + '        assert greener_helper.x == 2\n'
+        check = module_snapshot.IsolatedCheck()
+        check('blubb', '', test)
+        helper.write('x = 2')
+        self.assertIsNone(check('blubb', '', test))
+
+    def test_evicts_packages(self):
+        package = self.dir.mkdir('greener_package')
+        package.join('__init__.py').write('')
+        package.join('sub.py').write('')
+        check = module_snapshot.IsolatedCheck()
+        check('blubb', '', importing_test('greener_package.sub'))
+        self.assertNotIn('greener_package', sys.modules)
+        self.assertNotIn('greener_package.sub', sys.modules)
+
+    def test_keep(self):
+        self.dir.join('greener_helper.py').write('x = 1')
+        check = module_snapshot.IsolatedCheck(keep=['greener_helper'])
+        check('blubb', '', importing_test('greener_helper'))
+        self.assertIn('greener_helper', sys.modules)
+
+    def test_keeps_installed_modules(self):
+        name = 'xml.dom.minidom'
+        if name in sys.modules:
+            self.skipTest(f'{name} is already loaded')
+        check = module_snapshot.IsolatedCheck()
+        check('blubb', '', importing_test(name))
+        self.assertIn(name, sys.modules)
+
+    def test_puts_back_replaced_modules(self):
+        self.dir.join('greener_helper.py').write('x = 1')
+        import greener_helper
+        test = importing_test('sys', 'importlib') \
+            + "        sys.modules.pop('greener_helper')\n" \
+            + "        importlib.import_module('greener_helper')\n"
+        check = module_snapshot.IsolatedCheck()
+        check('blubb', '', test)
+        self.assertIs(sys.modules['greener_helper'], greener_helper)
+
+
+class TestFromProject(unittest.TestCase):
+    def test_installed(self):
+        import unittest.mock
+        self.assertFalse(module_snapshot.from_project(unittest.mock))
+        self.assertFalse(module_snapshot.from_project(sys))
+
+    def test_project(self):
+        self.assertTrue(module_snapshot.from_project(module_snapshot))
+        self.assertFalse(module_snapshot.from_project(
+            module_snapshot, keep=['module_snapshot']))
@@ -0,0 +1,136 @@
+import sys
+import textwrap
+import unittest
+from tempfile import TemporaryDirectory
+from py import path
+import multi_sut
+import run_code
+import save_file
+
+
+integration_test = textwrap.dedent("""\
+    import blubb
+    import helpers
+    import unittest
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            a = blubb.make(1)
+            b = helpers.Thing()
+            c = b.value
+            d = helpers.CONSTANT
+    """)
+
+
+shared_test = textwrap.dedent("""\
+    import blubb
+    import helpers
+    import unittest
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            try:
+                blubb.fail()
+            except helpers.Oops:
+                pass
+            blubb.x
+    """)
+shared_sources = {'blubb': 'import helpers\n\n\ndef fail():\n'
+                           '    raise helpers.Oops()\n',
+                  'helpers': 'class Oops(Exception):\n    pass\n'}
+
+
+def project():
+    return multi_sut.Project(integration_test,
+                             {'blubb': '', 'helpers': 'x = 1\n'})
+
+
+class TestLocalImports(unittest.TestCase):
+    def test_local_imports(self):
+        with TemporaryDirectory() as directory:
+            dir = path.local(directory)
+            for name in ['blubb', 'helpers', 'unused']:
+                dir.join(name + '.py').write('')
+            test = 'import unittest\nimport helpers\nimport blubb\n' \
+                'import os.path\nimport unused as u\n'
+            self.assertEqual(multi_sut.local_imports(test, directory),
+                             ['helpers', 'blubb'])
+
+    def test_broken_test(self):
+        self.assertEqual(multi_sut.local_imports('import (', '.'), [])
+
+
+class TestCheck(unittest.TestCase):
+    def test_several_suts(self):
+        res = run_code.check(('blubb', 'helpers'), ('', 'x = 1\n'),
+                             integration_test)
+        self.assertEqual(res.obj_name, 'blubb')
+        self.assertEqual(res.name, 'make')
+
+    def test_suts_share_modules(self):
+        """blubb and the test see the same helpers module"""
+        res = run_code.check(tuple(shared_sources),
+                             tuple(shared_sources.values()), shared_test)
+        self.assertEqual((res.exc_type, res.name), ('AttributeError', 'x'))
+        self.assertNotIn('helpers', sys.modules)
+
+
+class TestFixedProject(unittest.TestCase):
+    def test_routes_fixes(self):
+        res, issue = multi_sut.fixed_project(project())
+        self.assertIsNone(issue)
+        self.assertIn('def make(arg0):', res.sources['blubb'])
+        self.assertNotIn('Thing', res.sources['blubb'])
+        self.assertIn('class Thing:', res.sources['helpers'])
+        self.assertIn('self.value = None', res.sources['helpers'])
+        self.assertIn('CONSTANT = None', res.sources['helpers'])
+        self.assertIn('x = 1', res.sources['helpers'])
+        self.assertEqual(res.test, integration_test)
+
+    def test_without_static_stubs(self):
+        """the dynamic fixes alone get there, too"""
+        broken = project()
+        original = multi_sut.stubbed
+        multi_sut.stubbed = lambda project: project
+        try:
+            res, issue = multi_sut.fixed_project(broken)
+        finally:
+            multi_sut.stubbed = original
+        self.assertIsNone(issue)
+        self.assertIn('make', res.sources['blubb'])
+        self.assertIn('class Thing:', res.sources['helpers'])
+
+    def test_missing_import(self):
+        broken = multi_sut.Project(
+            integration_test.replace('import blubb\n', ''),
+            {'blubb': '', 'helpers': ''})
+        res, issue = multi_sut.fixed_project(broken)
+        self.assertIsNone(issue)
+        self.assertTrue(res.test.startswith('import blubb\n'))
+
+
+class TestSaveFile(unittest.TestCase):
+    def test_writes_all_files(self):
+        with TemporaryDirectory() as directory:
+            dir = path.local(directory)
+            test = dir.mkdir('tests').join('test_blubb.py')
+            test.write(integration_test)
+            dir.join('blubb.py').write('')
+            dir.join('helpers.py').write('x = 1\n')
+            save_file.save(test.strpath)
+            self.assertIn('def make', dir.join('blubb.py').read())
+            self.assertIn('class Thing', dir.join('helpers.py').read())
+            self.assertEqual(test.read(), integration_test)
+
+    def test_shared_module(self):
+        with TemporaryDirectory() as directory:
+            dir = path.local(directory)
+            test = dir.mkdir('tests').join('test_blubb.py')
+            test.write(shared_test)
+            for name, source in shared_sources.items():
+                dir.join(name + '.py').write(source)
+            files, issue = save_file.fixed_files(test, dir.join('blubb.py'))
+            self.assertIsNone(issue)
+            self.assertIn('x = None', files[1][2])
@@ -0,0 +1,40 @@
+import textwrap
+import unittest
+import fix_code
+import run_code
+from code import Code
+from resource_limit import ResourceLimit
+
+
+endless_test = textwrap.dedent("""\
+    import unittest
+    import blubb
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            blubb.x
+            while True:
+                pass
+    """)
+
+
+class TestResourceLimit(unittest.TestCase):
+    def test_match(self):
+        code = Code('blubb', '')
+        for exc_type, name in [('TimeoutError', 'timed out'),
+                               ('MemoryError', 'out of memory'),
+                               ('WorkerDied', 'crashed')]:
+            issue = fix_code.matching_issue(
+                run_code.Failure(exc_type, 'bla'), code)
+            self.assertEqual(type(issue), ResourceLimit)
+            self.assertEqual(issue.name, name)
+
+    def test_fix_loop_stops(self):
+        """the missing variable gets fixed, then the loop gives up"""
+        check = run_code.TargetedCheck(run_code.LimitedCheck(timeout=0.2))
+        code = Code('blubb', endless_test, '')
+        res, issue = fix_code.fixed_code_and_issue(code, check)
+        self.assertIn('x = None', res.source)
+        self.assertEqual(type(issue), ResourceLimit)
+        self.assertEqual(issue.name, 'timed out')
@@ -0,0 +1,255 @@
+import os
+import signal
+import textwrap
+import unittest
+import run_code
+from incremental import IncrementalCheck
+
+
+def two_tests(first, second):
+    return textwrap.dedent(f"""\
+        import unittest
+        import blubb
+
+
+        class TestSomething(unittest.TestCase):
+            def test_first(self):
+                {first}
+
+            def test_second(self):
+                {second}
+        """)
+
+
+class TestCheck(unittest.TestCase):
+    def test_reports_failing_test(self):
+        res = run_code.check('blubb', '', two_tests('pass', 'blubb.x'))
+        self.assertEqual(res.name, 'x')
+        self.assertEqual(res.test_id, 'TestSomething.test_second')
+
+    def test_stops_at_first_error(self):
+        res = run_code.check('blubb', '', two_tests('blubb.x', 'blubb.y'))
+        self.assertEqual(res.name, 'x')
+        self.assertEqual(res.test_id, 'TestSomething.test_first')
+
+    def test_failed_assertions_do_not_stop_the_run(self):
+        test = two_tests('self.assertTrue(False)', 'blubb.y')
+        res = run_code.check('blubb', '', test)
+        self.assertEqual(res.test_id, 'TestSomething.test_second')
+
+    def test_only_runs_given_test(self):
+        test = two_tests('blubb.x', 'pass')
+        self.assertIsNone(run_code.check('blubb', '', test,
+                                         'TestSomething.test_second'))
+
+    def test_missing_test_runs_everything(self):
+        test = two_tests('blubb.x', 'pass')
+        res = run_code.check('blubb', '', test, 'TestSomething.lol')
+        self.assertEqual(res.test_id, 'TestSomething.test_first')
+
+
+class TestFailure(unittest.TestCase):
+    def test_missing_variable(self):
+        res = run_code.check('blubb', '', two_tests('pass', 'blubb.x'))
+        self.assertEqual(res.exc_type, 'AttributeError')
+        self.assertEqual((res.obj_kind, res.obj_name), ('module', 'blubb'))
+        self.assertEqual(res.lineno, 10)
+        self.assertIn('"<test>", line 10', res.traceback)
+
+    def test_missing_attribute(self):
+        test = two_tests('blubb.Blubb().x', 'pass')
+        res = run_code.check('blubb', 'class Blubb:\n    pass', test)
+        self.assertEqual((res.obj_kind, res.obj_name), ('instance', 'Blubb'))
+        self.assertEqual(res.name, 'x')
+
+    def test_name_error(self):
+        res = run_code.check('blubb', '', two_tests('lalelu', 'pass'))
+        self.assertEqual((res.exc_type, res.name), ('NameError', 'lalelu'))
+        self.assertEqual(res.lineno, 7)
+
+    def test_error_outside_of_tests(self):
+        res = run_code.check('blubb', '', 'import lalelu')
+        self.assertEqual(res.exc_type, 'ModuleNotFoundError')
+        self.assertEqual(res.name, 'lalelu')
+        self.assertIsNone(res.test_id)
+
+    def test_check_all(self):
+        test = two_tests('blubb.x', 'blubb.y')
+        res = run_code.check_all('blubb', '', test)
+        self.assertEqual([el.name for el in res], ['x', 'y'])
+
+
+class TestTargetedCheck(unittest.TestCase):
+    def test_confirms_with_full_run(self):
+        check = run_code.TargetedCheck()
+        test = two_tests('blubb.x', 'blubb.y')
+        self.assertEqual(check('blubb', '', test).name, 'x')
+        self.assertEqual(check.test_id, 'TestSomething.test_first')
+        # the targeted test passes -> the full run finds the next error
+        self.assertEqual(check('blubb', 'x = None', test).name, 'y')
+        self.assertEqual(check.test_id, 'TestSomething.test_second')
+        self.assertIsNone(check('blubb', 'x = None\ny = None', test))
+
+
+def plain_tests(first, second):
+    return textwrap.dedent(f"""\
+        import blubb
+
+
+        def test_first():
+            {first}
+
+
+        class TestSomething:
+            def test_second(self):
+                {second}
+        """)
+
+
+class TestPlainTests(unittest.TestCase):
+    def test_reports_failing_function(self):
+        res = run_code.check('blubb', '', plain_tests('blubb.x', 'pass'))
+        self.assertEqual((res.name, res.test_id), ('x', 'test_first'))
+        self.assertEqual(res.lineno, 5)
+
+    def test_reports_failing_method(self):
+        res = run_code.check('blubb', '', plain_tests('pass', 'blubb.y'))
+        self.assertEqual((res.name, res.test_id),
+                         ('y', 'TestSomething.test_second'))
+
+    def test_failed_assertions_do_not_stop_the_run(self):
+        res = run_code.check('blubb', '', plain_tests('assert False',
+                                                      'blubb.y'))
+        self.assertEqual(res.test_id, 'TestSomething.test_second')
+
+    def test_check_all(self):
+        test = plain_tests('blubb.x', 'blubb.y')
+        res = run_code.check_all('blubb', '', test)
+        self.assertEqual([el.name for el in res], ['x', 'y'])
+
+    def test_only_runs_given_test(self):
+        test = plain_tests('pass', 'blubb.y')
+        self.assertIsNone(run_code.check('blubb', '', test, 'test_first'))
+        res = run_code.check('blubb', '', test, 'TestSomething.test_second')
+        self.assertEqual(res.name, 'y')
+
+    def test_skips_fixtures(self):
+        test = 'def test_first(tmp_path):\n    tmp_path.x\n'
+        self.assertIsNone(run_code.check('blubb', '', test))
+
+    def test_skips_classes_with_init(self):
+        test = textwrap.dedent("""\
+            import blubb
+
+
+            class TestData:
+                def __init__(self, value):
+                    self.value = value
+
+                def test_first(self):
+                    blubb.y
+
+
+            def test_second():
+                blubb.z
+            """)
+        res = run_code.check('blubb', '', test)
+        self.assertEqual((res.name, res.test_id), ('z', 'test_second'))
+
+    def test_setup_method(self):
+        test = textwrap.dedent("""\
+            import blubb
+
+
+            class TestSomething:
+                def setup_method(self, method):
+                    self.value = blubb.Blubb()
+
+                def test_first(self):
+                    self.value.x
+            """)
+        res = run_code.check('blubb', 'class Blubb:\n    pass', test)
+        self.assertEqual((res.obj_kind, res.name), ('instance', 'x'))
+
+    def test_targeted_check(self):
+        check = run_code.TargetedCheck()
+        test = plain_tests('blubb.x', 'blubb.y')
+        self.assertEqual(check('blubb', '', test).name, 'x')
+        self.assertEqual(check('blubb', 'x = None', test).name, 'y')
+        self.assertIsNone(check('blubb', 'x = None\ny = None', test))
+
+
+def address_space():
+    """bytes of address space this process already uses"""
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmSize:'):
+                return int(line.split()[1]) * 1024
+
+
+class TestLimitedCheck(unittest.TestCase):
+    def test_same_result(self):
+        check = run_code.LimitedCheck()
+        test = two_tests('pass', 'blubb.x')
+        self.assertEqual(check('blubb', '', test),
+                         run_code.check('blubb', '', test))
+        self.assertIsNone(check('blubb', 'x = 1', test))
+
+    def test_timeout(self):
+        check = run_code.LimitedCheck(timeout=0.2)
+        res = check('blubb', '', two_tests('while True: pass', 'pass'))
+        self.assertEqual(res.exc_type, 'TimeoutError')
+
+    def test_timeout_in_sut(self):
+        check = run_code.LimitedCheck(timeout=0.2)
+        res = check('blubb', 'while True: pass', two_tests('pass', 'pass'))
+        self.assertEqual(res.exc_type, 'TimeoutError')
+
+    @unittest.skipUnless(os.path.exists('/proc/self/status'), 'needs /proc')
+    def test_out_of_memory(self):
+        limit = address_space() + 256 * 2 ** 20
+        check = run_code.LimitedCheck(max_memory=limit)
+        res = check('blubb', '',
+                    two_tests(f'x = bytearray({limit})', 'pass'))
+        self.assertEqual(res.exc_type, 'MemoryError')
+        self.assertEqual(res.test_id, 'TestSomething.test_first')
+
+    def test_died(self):
+        check = run_code.LimitedCheck()
+        res = check('blubb', 'import os\nos._exit(1)',
+                    two_tests('pass', 'pass'))
+        self.assertEqual(res.exc_type, 'WorkerDied')
+
+
+class TestAlarmCheck(unittest.TestCase):
+    def test_same_result(self):
+        check = run_code.AlarmCheck()
+        test = two_tests('pass', 'blubb.x')
+        self.assertEqual(check('blubb', '', test),
+                         run_code.check('blubb', '', test))
+
+    def test_timeout(self):
+        check = run_code.AlarmCheck(timeout=0.2)
+        res = check('blubb', '', two_tests('while True: pass', 'pass'))
+        self.assertEqual(res.exc_type, 'TimeoutError')
+        # the alarm is gone afterwards
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+
+    def test_timeout_in_sut(self):
+        check = run_code.AlarmCheck(timeout=0.2)
+        res = check('blubb', 'while True: pass', two_tests('pass', 'pass'))
+        self.assertEqual(res.exc_type, 'TimeoutError')
+
+    def test_plain_test_catching_everything(self):
+        test = 'def test_first():\n    try:\n        while True: pass\n' \
+            '    except Exception:\n        pass\n'
+        res = run_code.AlarmCheck(timeout=0.2)('blubb', '', test)
+        self.assertEqual(res.exc_type, 'TimeoutError')
+
+    def test_keeps_incremental_state(self):
+        incremental = IncrementalCheck()
+        check = run_code.AlarmCheck(incremental)
+        test = two_tests('pass', 'pass')
+        check('blubb', 'x = 1\n', test)
+        check('blubb', 'x = 1\ny = 2\n', test)
+        self.assertEqual(incremental.partial_loads, 1)
@@ -1,15 +1,18 @@
+import os
 from . import vim
 from tempfile import TemporaryDirectory
 from py import path
 import unittest
 import textwrap
-# save_file is used indirectly
 # TODO: split this file into
 #  - test_fix_code.py (the actual unit tests)
 #  - some file with test utility functions
 #  - only end-to-end tests should stay here
-# import save_file
+import run_code
+import save_file
 from tests.test_fix_code import AbstractFilePair
+from tests.test_fix_code import several_tests
+from tests.test_speculative import class_not_function
 from code import Code
 from tests.framework import fix_code
 
@@ -83,3 +86,128 @@ class TestVim(unittest.TestCase):
         self.assertFalse(passes(file_pair))  # code needs fixing
         vim.save(file_pair.test)
         self.assertTrue(passes(file_pair))  # code was actually fixed
+
+
+class TestWriting(unittest.TestCase):
+    def setUp(self):
+        self.resource = TemporaryDirectory()
+        self.dir = path.local(self.resource.name)
+
+    def tearDown(self):
+        self.resource.cleanup()
+
+    def test_write_atomically(self):
+        file = self.dir.join('bla.py')
+        file.write('old')
+        file.chmod(0o640)
+        save_file.write_atomically(file, 'new')
+        self.assertEqual(file.read(), 'new')
+        self.assertEqual(file.stat().mode & 0o777, 0o640)
+        self.assertEqual(self.dir.listdir(), [file])  # no temporary files
+
+    def test_write_if_changed(self):
+        file = self.dir.join('bla.py')
+        self.assertTrue(save_file.write_if_changed(file, 'x = 1\n'))
+        mtime = file.stat().mtime_ns
+        self.assertFalse(save_file.write_if_changed(file, 'x = 1\n'))
+        self.assertEqual(file.stat().mtime_ns, mtime)
+        self.assertTrue(save_file.write_if_changed(file, 'x = 2\n'))
+        self.assertEqual(file.read(), 'x = 2\n')
+
+    def test_diff(self):
+        lines = list(save_file.diff('bla.py', 'x = 1\n', 'y = 1\nx = 1'))
+        self.assertEqual(lines[:2], ['--- a/bla.py\n', '+++ b/bla.py\n'])
+        self.assertIn('+y = 1\n', lines)
+        self.assertEqual(lines[-1], '\n\\ No newline at end of file\n')
+
+    def test_no_diff(self):
+        self.assertEqual(list(save_file.diff('bla.py', 'x\n', 'x\n')), [])
+
+    def test_patch(self):
+        """the patch applies the fix without touching any file"""
+        file_pair = FilePair(TemporaryDirectory(), TestVim().broken_code())
+        old_test = file_pair.test.read()
+        old_source = file_pair.source.read()
+        directory = file_pair.source.dirname
+        patch = ''.join(save_file.patch(file_pair.test.strpath,
+                                        directory=directory))
+        self.assertEqual(file_pair.test.read(), old_test)
+        self.assertEqual(file_pair.source.read(), old_source)
+        self.assertIn('+++ b/tests/test_blubb.py\n', patch)
+        self.assertIn('+++ b/blubb.py\n', patch)
+        self.assertIn('+import blubb\n', patch)
+        self.assertIn('+x = None\n', patch)
+
+    def test_save_only_writes_changes(self):
+        file_pair = FilePair(TemporaryDirectory(), TestVim().broken_code())
+        file_pair.test.write('import unittest\n')
+        mtime = file_pair.source.stat().mtime_ns
+        save_file.save(file_pair.test.strpath)
+        self.assertEqual(file_pair.source.stat().mtime_ns, mtime)
+
+    def test_save_leaves_files_alone_that_changed(self):
+        file_pair = FilePair(TemporaryDirectory(), TestVim().broken_code())
+
+        def check(*args):
+            # e.g. save_file.py fixing it after the server took too long
+            file_pair.source.write('y = None\n')
+            return run_code.check(*args)
+        save_file.save(file_pair.test.strpath, check)
+        self.assertEqual(file_pair.source.read(), 'y = None\n')
+        self.assertIn('import blubb', file_pair.test.read())
+
+
+class TestStrategy(unittest.TestCase):
+    def setUp(self):
+        self.old = os.environ.get('GREENER_PYTHON_STRATEGY')
+
+    def tearDown(self):
+        if self.old is None:
+            os.environ.pop('GREENER_PYTHON_STRATEGY', None)
+        else:
+            os.environ['GREENER_PYTHON_STRATEGY'] = self.old
+
+    def test_default(self):
+        os.environ.pop('GREENER_PYTHON_STRATEGY', None)
+        self.assertEqual(save_file.strategy(), 'single')
+
+    def test_unknown(self):
+        os.environ['GREENER_PYTHON_STRATEGY'] = 'lalelu'
+        with self.assertRaises(ValueError):
+            save_file.strategy()
+
+    def test_batch(self):
+        os.environ['GREENER_PYTHON_STRATEGY'] = 'batch'
+        runs = []
+        original = save_file.limited_check_all
+
+        def counting():
+            check_all = original()
+
+            def counted(*args):
+                runs.append(args)
+                return check_all(*args)
+            return counted
+        save_file.limited_check_all = counting
+        try:
+            test = several_tests('bla = collections.OrderedDict()',
+                                 'bla = textwrap.dedent("")',
+                                 'bla = json.dumps(1)')
+            res, issue = save_file.fixed_code_and_issue(
+                Code('blubb', test, ''))
+        finally:
+            save_file.limited_check_all = original
+        self.assertIsNone(issue)
+        for module in ('collections', 'textwrap', 'json'):
+            self.assertIn(f'import {module}', res.test)
+        # one run to find the three issues, one to confirm the fix
+        self.assertEqual(len(runs), 2)
+
+    def test_speculative(self):
+        os.environ['GREENER_PYTHON_STRATEGY'] = 'speculative'
+        spec = class_not_function
+        res, issue = save_file.fixed_code_and_issue(spec)
+        self.assertIsNone(issue)
+        self.assertIn('class make', res.source)
+        # the workers are kept for the next fix
+        self.assertIs(save_file.speculation(), save_file.speculation())
@@ -0,0 +1,90 @@
+import unittest
+import async_fix
+import fix_code
+import speculative
+from code import Code
+from missing_argument import MissingArgument
+from missing_function import MissingFunction
+from missing_function import MissingClass
+from worker_pool import WorkerPool
+from tests.framework import standard_test_spec
+
+
+# a function would return None, which has no attributes
+class_not_function = standard_test_spec(
+    'thing = blubb.make()\nb = thing.value')
+
+
+class TestCandidates(unittest.TestCase):
+    def test_alternatives(self):
+        code = Code('blubb', '', 'make = None\n')
+        candidates = fix_code.candidate_fixes(MissingFunction('make'), code,
+                                              width=2)
+        self.assertEqual([type(issue) for issue, _ in candidates],
+                         [MissingFunction, MissingClass])
+        self.assertIn('def make', candidates[0][1].source)
+        self.assertIn('class make', candidates[1][1].source)
+
+    def test_width(self):
+        code = Code('blubb', '', 'make = None\n')
+        candidates = fix_code.candidate_fixes(MissingFunction('make'), code)
+        self.assertEqual(len(candidates), 1)
+
+    def test_no_duplicates(self):
+        """without self is what the function gets anyway"""
+        code = Code('blubb', '', 'def f():\n    pass\n')
+        candidates = fix_code.candidate_fixes(MissingArgument('f', ['a']),
+                                              code, width=3)
+        self.assertEqual([issue.self_argument for issue, _ in candidates],
+                         [None, True])
+        self.assertIn('def f(self, a):', candidates[1][1].source)
+
+    def test_progress(self):
+        code = Code('blubb', '', 'x = None\n')
+        issue = MissingFunction('x')
+        self.assertEqual(fix_code.progress(issue, None, code), 0)
+        self.assertEqual(fix_code.progress(issue, MissingFunction('y'),
+                                           code), 2)  # nothing to fix
+        self.assertEqual(fix_code.progress(issue, MissingFunction('x'),
+                                           code), 3)  # not improved
+        self.assertEqual(fix_code.progress(issue, MissingClass('x'),
+                                           code), 1)
+
+
+class TestSpeculation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = WorkerPool(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_tries_class(self):
+        _, issue = fix_code.fixed_code_and_issue(class_not_function)
+        self.assertIsNotNone(issue)  # the first guess leads nowhere
+        speculation = speculative.Speculation(pool=self.pool)
+        res, issue = speculation.fixed_code_and_issue(class_not_function)
+        self.assertIsNone(issue)
+        self.assertIn('class make:', res.source)
+        self.assertIn('self.value = None', res.source)
+
+    def test_budget(self):
+        """without time, only the first guess is checked"""
+        speculation = speculative.Speculation(budget=0, pool=self.pool)
+        res, issue = speculation.fixed_code_and_issue(class_not_function)
+        self.assertIsNotNone(issue)
+        self.assertIn('def make', res.source)
+
+    def test_same_result_if_no_guessing_needed(self):
+        spec = standard_test_spec('bla = blubb.x')
+        speculation = speculative.Speculation(pool=self.pool)
+        self.assertEqual(speculation.fixed_code(spec).source,
+                         fix_code.fixed_code(spec).source)
+
+
+class TestAsyncSpeculation(unittest.IsolatedAsyncioTestCase):
+    async def test_tries_class(self):
+        res = await async_fix.fixed_code_async(class_not_function, width=2)
+        self.assertIn('class make:', res.source)
+        self.assertIsNone(fix_code.problem(res))
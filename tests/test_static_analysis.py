@@ -0,0 +1,92 @@
+import unittest
+import fix_code
+import run_code
+import static_analysis
+from tests.framework import standard_test_spec
+
+
+class CountingCheck:
+    def __init__(self):
+        self.runs = 0
+
+    def __call__(self, name, source_code, test_code):
+        self.runs += 1
+        return run_code.check(name, source_code, test_code)
+
+
+def stubs(test, source=''):
+    return static_analysis.stubs(standard_test_spec(test, source))
+
+
+class TestStubs(unittest.TestCase):
+    def test_variable(self):
+        self.assertEqual(stubs('bla = blubb.x'), ['x = None\n'])
+
+    def test_function(self):
+        self.assertEqual(stubs('arg = 1\nbla = blubb.fun(arg, 42, a=3)'),
+                         ['def fun(arg, arg0, a=1):\n    pass\n'])
+
+    def test_class(self):
+        self.assertEqual(stubs('a = blubb.Something(17)'),
+                         ['class Something:\n'
+                          '    def __init__(self, arg0):\n'
+                          '        pass\n'])
+
+    def test_in_order_of_appearance(self):
+        self.assertEqual(stubs('bla = blubb.y\nbla = blubb.x'),
+                         ['y = None\n', 'x = None\n'])
+
+    def test_defined_names_are_left_alone(self):
+        self.assertEqual(stubs('bla = blubb.fun(blubb.x)',
+                               """
+                               x = 3
+                               def fun():
+                                   pass
+                               """),
+                         [])
+
+    def test_names_defined_in_compound_statements(self):
+        self.assertEqual(stubs('bla = blubb.fun(blubb.dumps)',
+                               """
+                               import sys
+                               try:
+                                   from json import dumps
+                               except ImportError:
+                                   dumps = None
+                               if sys.version_info >= (3,):
+                                   def fun(x):
+                                       pass
+                               """),
+                         [])
+
+    def test_disagreeing_calls_are_left_to_the_fix_loop(self):
+        self.assertEqual(stubs('blubb.fun(1)\nblubb.fun(1, 2)'), [])
+
+    def test_wildcard_import_in_SUT(self):
+        self.assertEqual(stubs('bla = blubb.x', 'from os import *'), [])
+
+    def test_needs_SUT_import(self):
+        spec = standard_test_spec('bla = blubb.x')
+        spec.test = spec.test.replace('import blubb', '')
+        self.assertEqual(static_analysis.stubs(spec), [])
+
+
+class TestStaticPrepass(unittest.TestCase):
+    def test_single_check_for_many_stubs(self):
+        spec = standard_test_spec(
+            """
+            a = blubb.Something(1, 2)
+            b = blubb.fun(a)
+            c = blubb.other_fun(b, x=3)
+            d = blubb.x
+            """)
+        check = CountingCheck()
+        res = fix_code.fixed_code(spec, check)
+        self.assertIsNone(run_code.check(res.name, res.source, res.test))
+        self.assertEqual(check.runs, 1)
+
+    def test_no_stubs_if_the_SUT_passes_anyway(self):
+        spec = standard_test_spec('bla = blubb.x', "globals()['x'] = 1")
+        self.assertTrue(static_analysis.stubs(spec))
+        res = fix_code.fixed_code(spec)
+        self.assertEqual(res.source, spec.source)
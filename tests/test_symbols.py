@@ -0,0 +1,132 @@
+import textwrap
+import unittest
+from code import Code
+from symbols import symbol_table
+
+
+source = textwrap.dedent("""\
+    import os
+    x = None
+
+
+    class FooBar:
+        def __init__(self):
+            pass
+
+
+    class Foo:
+        def method(self):
+            pass
+
+        def __init__(self):
+            self.x = None
+
+
+    def fun():
+        pass""")
+
+
+def symbols(code):
+    return sorted((el.start, el.end, el.indent) + el.key()
+                  for el in code.symbols.symbols)
+
+
+class TestSymbolTable(unittest.TestCase):
+    def setUp(self):
+        self.table = symbol_table(source.split('\n'))
+
+    def test_exact_class_names(self):
+        self.assertEqual(self.table.get('class', 'Foo').start, 9)
+        self.assertEqual(self.table.get('def', '__init__', 'Foo').start, 13)
+        self.assertEqual(self.table.get('def', '__init__', 'FooBar').start,
+                         5)
+        self.assertIsNone(self.table.get('class', 'Fo'))
+
+    def test_ranges(self):
+        foo = self.table.get('class', 'Foo')
+        self.assertEqual((foo.start, foo.end), (9, 15))
+
+    def test_module_level_names(self):
+        self.assertEqual(self.table.names(),
+                         {'os', 'x', 'FooBar', 'Foo', 'fun'})
+
+    def test_attributes(self):
+        attribute = self.table.first('attribute', 'x')
+        self.assertEqual((attribute.owner, attribute.start), ('Foo', 14))
+
+    def test_first(self):
+        self.assertEqual(self.table.first('def', '__init__').owner, 'FooBar')
+        self.assertEqual(self.table.first('def', 'method').owner, 'Foo')
+
+    def test_compound_statements(self):
+        table = symbol_table(textwrap.dedent("""\
+            try:
+                from json import dumps
+            except ImportError as e:
+                pass
+            if True:
+                def fun():
+                    pass
+            for i in range(3):
+                pass
+            """).split('\n'))
+        self.assertEqual(table.names(), {'dumps', 'e', 'fun', 'i'})
+        fun = table.get('def', 'fun')
+        self.assertEqual((fun.start, fun.end, fun.indent), (5, 7, 4))
+
+    def test_unparsable_source(self):
+        self.assertIsNone(symbol_table(['def fun()', '    pass']))
+
+
+class TestIncrementalUpdates(unittest.TestCase):
+    """updating the table gives the same result as building it again"""
+    def assertUpdated(self, start, end, new_lines):
+        code = Code('blubb', '', source)
+        code.symbols
+        edited = code.with_changed_lines(start, end, new_lines)
+        self.assertIsNotNone(edited._symbols)
+        fresh = Code('blubb', '', edited.source)
+        self.assertEqual(symbols(edited), symbols(fresh))
+
+    def test_prepend_variable(self):
+        self.assertUpdated(0, 0, ['y = None', '', ''])
+
+    def test_add_attribute(self):
+        self.assertUpdated(14, 14, ['        self.y = None'])
+
+    def test_replace_variable_with_function(self):
+        self.assertUpdated(1, 2, ['def x():', '    pass'])
+
+    def test_append_method_to_class(self):
+        self.assertUpdated(15, 15, ['    def bla():', '        pass'])
+
+    def test_append_method_at_end_of_file(self):
+        self.assertUpdated(19, 19, ['    def bla():', '        pass'])
+
+    def test_delete_method(self):
+        self.assertUpdated(10, 13, [])
+
+    def test_rename_class(self):
+        self.assertUpdated(4, 5, ['class Bla:'])
+
+    def test_rename_class_and_add_base(self):
+        self.assertUpdated(4, 5, ['class Bla(', '        object):'])
+
+    def assertReparsed(self, start, end, new_lines):
+        """the edit isn't self-contained, so the table is built again"""
+        code = Code('blubb', '', source)
+        code.symbols
+        edited = code.with_changed_lines(start, end, new_lines)
+        self.assertIsNone(edited._symbols)
+        fresh = Code('blubb', '', edited.source)
+        self.assertEqual(edited.symbols is None, fresh.symbols is None)
+
+    def test_delete_body(self):
+        self.assertReparsed(5, 20, [])
+        self.assertReparsed(18, 19, [])
+
+    def test_delete_start_of_class(self):
+        self.assertReparsed(4, 6, [])
+
+    def test_change_signature(self):
+        self.assertUpdated(10, 11, ['    def method(self, a, b=1):'])
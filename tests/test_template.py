@@ -18,3 +18,9 @@ class TestTemplate(unittest.TestCase):
         self.assertIn("import long_file_name", res)
         self.assertNotIn("import long_file_name.py", res)
         self.assertNotIn("import test_long_file_name", res)
+
+    def test_create_pytest(self):
+        res = template.create("test_bla.py", 'pytest')
+        self.assertIn("import bla", res)
+        self.assertNotIn("import unittest", res)
+        self.assertIn("def test_bla():", res)
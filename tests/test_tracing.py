@@ -0,0 +1,74 @@
+import io
+import json
+import unittest
+import fix_code
+import tracing
+from tests.framework import standard_test_spec
+
+
+def events(file):
+    text = file.getvalue()
+    assert text.startswith('[\n')
+    # the viewers don't need the closing bracket, json does
+    return json.loads(text.rstrip().rstrip(',') + ']')
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.file = io.StringIO()
+        tracing.start(self.file)
+
+    def tearDown(self):
+        tracing.stop()
+
+    def test_disabled(self):
+        tracing.stop()
+        span = tracing.span('bla', x=1)
+        self.assertIs(span, tracing.disabled)
+        with span as s:
+            s.set(y=2)
+        self.assertEqual(events(self.file), [])
+
+    def test_span(self):
+        with tracing.span('outer', x=1) as outer:
+            with tracing.span('inner'):
+                pass
+            outer.set(y=2)
+        inner, outer = events(self.file)
+        self.assertEqual(inner['name'], 'inner')
+        self.assertEqual(inner['ph'], 'X')
+        self.assertEqual(outer['args']['x'], 1)
+        self.assertEqual(outer['args']['y'], 2)
+        self.assertIn('inner_ms', outer['args'])
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['dur'], inner['dur'])
+
+    def test_exception(self):
+        with self.assertRaises(KeyError):
+            with tracing.span('broken'):
+                raise KeyError()
+        self.assertEqual(events(self.file)[0]['args']['error'], 'KeyError')
+
+    def test_json_lines(self):
+        file = io.StringIO()
+        tracing.start(file, json_lines=True)
+        with tracing.span('bla'):
+            pass
+        lines = file.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[0])['name'], 'bla')
+
+    def test_fixed_code(self):
+        code = standard_test_spec('bla = blubb.some_function(1, 2)',
+                                  'def some_function():\n    pass\n')
+        fix_code.fixed_code(code)
+        res = events(self.file)
+        names = [el['name'] for el in res]
+        self.assertEqual(names[-1], 'fixed_code')
+        self.assertIn('run', names)
+        self.assertIn('match', names)
+        iterations = [el['args'] for el in res if el['name'] == 'iteration']
+        self.assertEqual(iterations[0]['issue'], 'MissingArgument')
+        self.assertTrue(iterations[0]['improved'])
+        # the fix worked, so there's nothing to match after it
+        for key in ['check_ms', 'fix_ms']:
+            self.assertIn(key, iterations[0])
@@ -0,0 +1,158 @@
+from tempfile import TemporaryDirectory
+from py import path
+import threading
+import textwrap
+import unittest
+import time
+import watch
+
+
+broken_test = textwrap.dedent("""\
+    import unittest
+
+
+    class TestSomething(unittest.TestCase):
+        def test_something(self):
+            bla = blubb.x
+    """)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.resource = TemporaryDirectory()
+        self.dir = path.local(self.resource.name)
+
+    def tearDown(self):
+        self.resource.cleanup()
+
+    def changes(self, watcher):
+        try:
+            self.dir.join('test_bla.py').write('x = 1')
+            self.dir.join('bla.py').write('x = 1')
+            return watcher.changes(2)
+        finally:
+            watcher.close()
+
+    def test_polling(self):
+        watcher = watch.PollingWatcher(self.dir.strpath, interval=0.01)
+        self.assertEqual(self.changes(watcher),
+                         {self.dir.join('test_bla.py').strpath})
+
+    def test_inotify(self):
+        try:
+            watcher = watch.InotifyWatcher(self.dir.strpath)
+        except (OSError, AttributeError):
+            self.skipTest('no inotify')
+        self.assertEqual(self.changes(watcher),
+                         {self.dir.join('test_bla.py').strpath})
+
+    def test_inotify_new_directory(self):
+        try:
+            watcher = watch.InotifyWatcher(self.dir.strpath)
+        except (OSError, AttributeError):
+            self.skipTest('no inotify')
+        try:
+            self.dir.mkdir('sub')
+            watcher.changes(1)  # picks up the new directory
+            self.dir.join('sub', 'test_bla.py').write('x = 1')
+            self.assertEqual(watcher.changes(2),
+                             {self.dir.join('sub', 'test_bla.py').strpath})
+        finally:
+            watcher.close()
+
+    def test_nothing_changed(self):
+        watcher = watch.PollingWatcher(self.dir.strpath, interval=0.01)
+        self.assertEqual(watcher.changes(0.05), set())
+
+
+class FakeWatcher:
+    """hands out prepared bursts of changes"""
+    def __init__(self, bursts):
+        self.bursts = list(bursts)
+        self.closed = False
+
+    def changes(self, timeout):
+        if self.bursts:
+            return self.bursts.pop(0)
+        time.sleep(timeout)
+        return set()
+
+    def close(self):
+        self.closed = True
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.resource = TemporaryDirectory()
+        self.dir = path.local(self.resource.name)
+        self.tests = self.dir.mkdir('tests')
+        self.test = self.tests.join('test_blubb.py')
+        self.source = self.dir.join('blubb.py')
+
+    def tearDown(self):
+        self.resource.cleanup()
+
+    def test_tests_directory(self):
+        self.assertEqual(watch.tests_directory(self.dir.strpath),
+                         self.tests.strpath)
+        self.assertEqual(watch.tests_directory(self.tests.strpath),
+                         self.tests.strpath)
+
+    def test_fix(self):
+        self.test.write(broken_test)
+        w = watch.Watch(self.dir.strpath, watcher=FakeWatcher([]))
+        w.fix(self.test.strpath)
+        self.assertIn('import blubb', self.test.read())
+        self.assertIn('x = None', self.source.read())
+
+    def test_skips_unchanged(self):
+        self.test.write(broken_test)
+        calls = []
+
+        def check(*args, **kwargs):
+            calls.append(args)
+        w = watch.Watch(self.dir.strpath, watcher=FakeWatcher([]),
+                        check=check)
+        w.fix(self.test.strpath)
+        self.assertTrue(calls)
+        calls.clear()
+        w.fix(self.test.strpath)  # our own write -> nothing to do
+        self.assertFalse(calls)
+
+    def test_debounce(self):
+        """a burst of changes to the same file is only fixed once"""
+        self.test.write(broken_test)
+        name = self.test.strpath
+        fixed = []
+        w = watch.Watch(self.dir.strpath, debounce=0.01,
+                        watcher=FakeWatcher([{name}, {name}, {name}]))
+        w.fix = fixed.append
+        thread = threading.Thread(target=w.run)
+        thread.start()
+        self.assertTrue(wait_for(lambda: fixed))
+        w.stop()
+        thread.join()
+        self.assertEqual(fixed, [name])
+        self.assertTrue(w.watcher.closed)
+
+    def test_end_to_end(self):
+        self.test.write('')
+        w = watch.Watch(self.dir.strpath, debounce=0.05)
+        thread = threading.Thread(target=w.run)
+        thread.start()
+        try:
+            self.test.write(broken_test)
+            self.assertTrue(wait_for(
+                lambda: 'import blubb' in self.test.read()))
+        finally:
+            w.stop()
+            thread.join()
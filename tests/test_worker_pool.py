@@ -0,0 +1,83 @@
+import unittest
+import fix_code
+import run_code
+from worker_pool import WorkerPool
+from tests.framework import in_test_function
+from tests.framework import standard_test_spec
+
+
+def job(spec):
+    return (spec.name, spec.source, spec.test)
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(size=2, max_runs=3, timeout=1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_same_result_as_in_process(self):
+        spec = standard_test_spec('bla = blubb.x')
+        self.assertEqual(self.pool.check(*job(spec)),
+                         run_code.check(*job(spec)))
+
+    def test_results_in_order_of_jobs(self):
+        passing = standard_test_spec('bla = blubb.x', 'x = None')
+        failing = standard_test_spec('bla = blubb.x')
+        res = self.pool.map([job(failing), job(passing), job(passing),
+                             job(failing), job(passing)])
+        self.assertEqual([el is None for el in res],
+                         [False, True, True, False, True])
+
+    def test_state_does_not_leak(self):
+        setting = standard_test_spec('blubb.x = 42', 'x = None')
+        reading = standard_test_spec('assert blubb.x is None', 'x = None')
+        self.assertEqual(self.pool.map([job(setting)] * 3 + [job(reading)]),
+                         [None] * 4)
+
+    def test_infinite_loop_times_out(self):
+        spec = standard_test_spec('while True: pass')
+        self.assertEqual(self.pool.check(*job(spec)).exc_type, 'TimeoutError')
+        # the pool still works afterwards
+        spec = standard_test_spec('bla = blubb.x', 'x = None')
+        self.assertIsNone(self.pool.check(*job(spec)))
+
+    def test_idle_worker_died(self):
+        for worker in self.pool.workers:
+            worker.process.kill()
+            worker.process.join()
+        spec = standard_test_spec('bla = blubb.x', 'x = None')
+        self.assertEqual(self.pool.map([job(spec)] * 3), [None] * 3)
+        self.assertEqual(len(self.pool.workers), 2)
+        self.assertIsNone(self.pool.check(*job(spec)))
+
+    def test_workers_are_recycled(self):
+        spec = standard_test_spec('bla = blubb.x', 'x = None')
+        with WorkerPool(size=1, max_runs=3) as pool:
+            old = pool.workers[0].process
+            pool.map([job(spec)] * 2)
+            self.assertIs(pool.workers[0].process, old)
+            pool.map([job(spec)])
+            self.assertIsNot(pool.workers[0].process, old)
+
+    def test_fixed_code(self):
+        spec = standard_test_spec('bla = blubb.some_function(1)')
+        res = fix_code.fixed_code(spec, check=self.pool.check)
+        self.assertIsNone(run_code.check(*job(res)))
+
+
+class TestCleanNamespace(unittest.TestCase):
+    def test_test_needs_to_import_unittest(self):
+        test = in_test_function('pass').replace('import unittest', '')
+        self.assertIsNotNone(run_code.check('blubb', '', test))
+
+    def test_SUT_sees_its_own_globals(self):
+        spec = standard_test_spec(
+            'assert blubb.fun() == 42',
+            """
+            x = 42
+            def fun():
+                return x
+            """)
+        self.assertIsNone(run_code.check(*job(spec)))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""where does the time of a save go?
+
+records a span per fix loop iteration, per check and per match
+a span adds the time of its children to its own args (check_ms, ...)
+the output can be loaded into chrome://tracing or https://ui.perfetto.dev
+(the viewers accept the array without its closing bracket)
+or written as JSON lines if the file name ends with .jsonl
+
+tracing is off unless start is called, e.g. by setting
+GREENER_PYTHON_TRACE to a file name
+while it's off, span returns a shared object that does nothing"""
+
+import os
+import json
+import time
+import threading
+
+tracer = None
+
+
+class Disabled:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+disabled = Disabled()
+
+
+class Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        # not necessarily the last one: async fixes interleave their spans
+        self.tracer.stack().remove(self)
+        if self.parent is not None:
+            key = self.name + '_ms'
+            self.parent.args[key] = self.parent.args.get(key, 0) \
+                + self.duration * 1000
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.write(self)
+        return False
+
+
+class Tracer:
+    def __init__(self, file, json_lines=False):
+        self.file = file
+        self.json_lines = json_lines
+        self.origin = time.perf_counter()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        if not json_lines:
+            file.write('[\n')
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def span(self, name, args):
+        return Span(self, name, args)
+
+    def write(self, span):
+        # complete events, in microseconds
+        event = {'name': span.name, 'ph': 'X', 'pid': os.getpid(),
+                 'tid': threading.get_ident(),
+                 'ts': (span.start - self.origin) * 1e6,
+                 'dur': span.duration * 1e6, 'args': span.args}
+        line = json.dumps(event, default=str)
+        with self.lock:
+            self.file.write(line + ('\n' if self.json_lines else ',\n'))
+            self.file.flush()
+
+
+def span(name, **args):
+    """use as a context manager, args end up in the trace"""
+    if tracer is None:
+        return disabled
+    return tracer.span(name, args)
+
+
+def start(file, json_lines=False):
+    """file is a file name or a file object"""
+    global tracer
+    if isinstance(file, str):
+        json_lines = file.endswith('.jsonl')
+        file = open(file, 'a' if json_lines else 'w')
+    tracer = Tracer(file, json_lines)
+    return tracer
+
+
+def stop():
+    global tracer
+    res, tracer = tracer, None
+    return res
+
+
+def start_from_environment():
+    file = os.environ.get('GREENER_PYTHON_TRACE')
+    if file:
+        start(file)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""fix tests whenever they change, no matter which editor changed them
+
+watches the tests directory of a project (inotify on Linux, polling
+everywhere else) and fixes each test together with its source file
+bursts of writes are collected until things calm down
+files that look the same as after the last fix are skipped"""
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from py import path
+import create_file
+import save_file
+import tracing
+
+
+def tests_directory(root):
+    """the tests directory of the project, the project itself if there's
+    none (tests next to the source files)"""
+    tests = os.path.join(root, 'tests')
+    return tests if os.path.isdir(tests) else root
+
+
+class PollingWatcher:
+    def __init__(self, directory, interval=0.2):
+        self.directory = directory
+        self.interval = interval
+        self.mtimes = self.scan()
+
+    def scan(self):
+        res = {}
+        for file in create_file.test_files(self.directory):
+            try:
+                res[file] = os.stat(file).st_mtime_ns
+            except FileNotFoundError:
+                pass  # deleted while we were looking
+        return res
+
+    def changes(self, timeout):
+        """test files that changed, waits up to timeout seconds for any"""
+        deadline = time.monotonic() + timeout
+        while True:
+            mtimes = self.scan()
+            res = {file for file, mtime in mtimes.items()
+                   if self.mtimes.get(file) != mtime}
+            self.mtimes = mtimes
+            remaining = deadline - time.monotonic()
+            if res or remaining <= 0:
+                return res
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    # from <sys/inotify.h>
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_ISDIR = 0x40000000
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    event = struct.Struct('iIII')
+
+    def __init__(self, directory):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                use_errno=True)
+        self.fd = self.libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        self.directories = {}  # watch descriptor -> directory
+        for dir, _, _ in os.walk(directory):
+            self.add(dir)
+
+    def add(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory),
+                                         self.mask)
+        if wd >= 0:
+            self.directories[wd] = directory
+
+    def changes(self, timeout):
+        """test files that changed, waits up to timeout seconds for any"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        res = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = self.event.unpack_from(data, pos)
+            pos += self.event.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            file = os.path.join(self.directories.get(wd, ''), name)
+            if mask & self.IN_ISDIR:
+                if mask & self.IN_CREATE:
+                    self.add(file)
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO) \
+                    and create_file.is_test_file(file):
+                res.add(file)
+        return res
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watcher_for(directory):
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError):
+        # no inotify on this system
+        return PollingWatcher(directory)
+
+
+def content_hash(*files):
+    res = hashlib.sha256()
+    for file in files:
+        res.update(file.read_binary() if file.check() else b'')
+        res.update(b'\0')
+    return res.hexdigest()
+
+
+class Watch:
+    def __init__(self, root, debounce=0.1, watcher=None, check=None):
+        self.directory = tests_directory(root)
+        self.watcher = watcher or watcher_for(self.directory)
+        self.debounce = debounce
+        self.check = check
+        self.hashes = {}  # test file -> hash of test and source after fix
+        self.stopped = threading.Event()
+        # one file at a time, in the background
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def run(self):
+        while not self.stopped.is_set():
+            changed = self.watcher.changes(0.5)
+            if not changed:
+                continue
+            while True:
+                more = self.watcher.changes(self.debounce)
+                if not more:
+                    break
+                changed |= more
+            for file in sorted(changed):
+                self.executor.submit(self.fix, file)
+        self.executor.shutdown()
+        self.watcher.close()
+
+    def stop(self):
+        self.stopped.set()
+
+    def fix(self, name):
+        test_file = path.local(name)
+        source_file = create_file.source_file_name(test_file)
+        if content_hash(test_file, source_file) == self.hashes.get(name):
+            return  # that's just us, writing the fixed files
+        start = time.perf_counter()
+        try:
+            create_file.add_if_missing(source_file)
+            save_file.save_pair(test_file, source_file,
+                                self.check or save_file.cached_check())
+        except Exception as e:
+            print(f'could not fix {name}: {e}', file=sys.stderr)
+            return
+        self.hashes[name] = content_hash(test_file, source_file)
+        duration = (time.perf_counter() - start) * 1000
+        print(f'fixed {name} in {duration:.1f} ms', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    assert len(sys.argv) <= 2
+    root = os.path.abspath(sys.argv[1] if len(sys.argv) == 2 else '.')
+    tracing.start_from_environment()
+    watch = Watch(root)
+    print(f'watching {watch.directory}', file=sys.stderr)
+    try:
+        watch.run()
+    except KeyboardInterrupt:
+        watch.stop()
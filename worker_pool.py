@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""run checks in a pool of pre-forked worker processes
+
+every check runs in a clean namespace in one of the workers
+workers are replaced after a number of runs, when a check leaves
+non-standard modules behind, or when a check takes too long"""
+
+import os
+import sys
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+# imported here so that forked workers don't have to import it again
+import unittest  # noqa: F401
+import run_code
+
+
+def leaked_modules(before):
+    """modules that a check left behind
+    the standard library is harmless, everything else might carry state"""
+    return [name for name in set(sys.modules) - before
+            if name.split('.')[0] not in sys.stdlib_module_names]
+
+
+def serve(connection):
+    while True:
+        job = connection.recv()
+        if job is None:
+            return
+        before = set(sys.modules)
+        res = run_code.check(*job)
+        connection.send((res, bool(leaked_modules(before))))
+
+
+class Worker:
+    def __init__(self, context):
+        self.runs = 0
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=serve, args=(child,),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass  # already dead
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    def __init__(self, size=None, max_runs=100, timeout=10):
+        self.context = multiprocessing.get_context('fork')
+        self.max_runs = max_runs
+        self.timeout = timeout
+        self.workers = [Worker(self.context)
+                        for _ in range(size or os.cpu_count())]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def check(self, name, source_code, test_code):
+        """drop-in replacement for run_code.check"""
+        return self.map([(name, source_code, test_code)])[0]
+
+    def recycled(self, worker, leaked):
+        worker.runs += 1
+        if leaked or worker.runs >= self.max_runs:
+            worker.stop()
+            return Worker(self.context)
+        return worker
+
+    def replaced(self, worker):
+        worker.kill()
+        return Worker(self.context)
+
+    def map(self, jobs, timeout=None):
+        """run several checks in parallel
+        jobs are (name, source_code, test_code) tuples
+        the results come in the same order as the jobs
+        timeout overrides the pool's timeout for these jobs"""
+        timeout = timeout if timeout is not None else self.timeout
+        results = [None] * len(jobs)
+        pending = list(enumerate(jobs))[::-1]
+        idle = list(self.workers)
+        busy = {}  # connection -> (worker, index of job, deadline)
+        try:
+            while pending or busy:
+                self.start(pending, idle, busy, timeout)
+                self.collect(results, idle, busy, timeout)
+        finally:
+            # whatever happens, the pool keeps all of its workers
+            self.workers = idle + [worker for worker, _, _ in busy.values()]
+        return results
+
+    def start(self, pending, idle, busy, timeout):
+        while pending and idle:
+            index, job = pending.pop()
+            worker = idle.pop()
+            try:
+                worker.connection.send(job)
+            except OSError:
+                # the worker died while it was idle, try again with a new one
+                pending.append((index, job))
+                idle.append(self.replaced(worker))
+                continue
+            deadline = time.monotonic() + timeout
+            busy[worker.connection] = (worker, index, deadline)
+
+    def collect(self, results, idle, busy, timeout):
+        next_deadline = min(deadline for _, _, deadline in busy.values())
+        for connection in wait(busy, max(next_deadline - time.monotonic(),
+                                         0)):
+            worker, index, _ = busy.pop(connection)
+            try:
+                results[index], leaked = connection.recv()
+                idle.append(self.recycled(worker, leaked))
+            except (EOFError, OSError):
+                results[index] = run_code.Failure(
+                    'WorkerDied', 'worker died during check')
+                idle.append(self.replaced(worker))
+        now = time.monotonic()
+        for connection, (worker, index, deadline) in list(busy.items()):
+            if deadline <= now:
+                del busy[connection]
+                results[index] = run_code.Failure(
+                    'TimeoutError',
+                    f'check timed out after {timeout} seconds')
+                idle.append(self.replaced(worker))